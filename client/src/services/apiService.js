@@ -303,12 +303,15 @@ class ApiService {
   }
 
   /**
-   * End current chat session
+   * End a chat session
+   * @param {string} sessionId - Session ID returned by startChatSession or sendChatMessage
    * @returns {Promise<Object>} Session summary
    */
-  async endChatSession() {
+  async endChatSession(sessionId) {
     try {
-      const response = await apiClient.post('/api/chat/session/end');
+      const response = await apiClient.post('/api/chat/session/end', null, {
+        params: { session_id: sessionId }
+      });
       return response.data;
     } catch (error) {
       console.error('Error ending chat session:', error);
@@ -10,7 +10,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 import logging
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 import json
 
@@ -101,7 +101,14 @@ class AIInsightsGenerator:
                 'generation_timestamp': datetime.now().isoformat()
             }
 
-    async def generate_insights_async(self, start_date: str, end_date: str, more_insights: bool = False) -> Dict[str, Any]:
+    @staticmethod
+    async def _provided(data: Dict) -> Dict:
+        return data
+
+    async def generate_insights_async(self, start_date: str, end_date: str, more_insights: bool = False,
+                                      operations_data: Optional[Dict] = None,
+                                      safety_data: Optional[Dict] = None,
+                                      combined_data: Optional[Dict] = None) -> Dict[str, Any]:
         """
         Generate 10 AI-powered insights from combined KPI data using parallel execution
 
@@ -109,6 +116,8 @@ class AIInsightsGenerator:
             start_date: Start date for KPI analysis (YYYY-MM-DD)
             end_date: End date for KPI analysis (YYYY-MM-DD)
             more_insights: Whether to generate additional diverse insights
+            operations_data, safety_data, combined_data: Already extracted KPIs for the same range
+                (e.g. from the server's KPI cache); only missing ones are extracted here
 
         Returns:
             Dictionary containing 10 AI-generated insights
@@ -119,14 +128,14 @@ class AIInsightsGenerator:
             # Extract all KPI data in parallel for faster execution
             loop = asyncio.get_event_loop()
             with ThreadPoolExecutor(max_workers=3) as executor:
-                # Submit all tasks to the thread pool
-                operations_future = loop.run_in_executor(
+                # Submit the extractions the caller did not provide to the thread pool
+                operations_future = self._provided(operations_data) if operations_data is not None else loop.run_in_executor(
                     executor, self._extract_operations_kpis_sync, start_date, end_date
                 )
-                safety_future = loop.run_in_executor(
+                safety_future = self._provided(safety_data) if safety_data is not None else loop.run_in_executor(
                     executor, self._extract_safety_kpis_sync, start_date, end_date
                 )
-                combined_future = loop.run_in_executor(
+                combined_future = self._provided(combined_data) if combined_data is not None else loop.run_in_executor(
                     executor, self._extract_combined_kpis_sync, start_date, end_date
                 )
 
@@ -137,7 +146,10 @@ class AIInsightsGenerator:
 
             logger.info("All KPI data extracted in parallel for AI insights generation")
 
-            return self._process_insights_data(operations_data, safety_data, combined_data, start_date, end_date, more_insights)
+            # The AI request is blocking, keep it off the event loop
+            return await asyncio.to_thread(
+                self._process_insights_data, operations_data, safety_data, combined_data, start_date, end_date, more_insights
+            )
             
         except Exception as e:
             logger.error(f"Error generating AI insights (parallel): {e}")
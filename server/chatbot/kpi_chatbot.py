@@ -5,6 +5,7 @@ Combines KPI data loading with Azure OpenAI for intelligent conversations
 
 import os
 import sys
+import copy
 import logging
 from datetime import datetime
 from typing import Dict, Any, Optional, List
@@ -72,6 +73,21 @@ class KPIChatbot:
             "welcome_message": self._get_welcome_message()
         }
         
+    def new_session_bot(self) -> 'KPIChatbot':
+        """
+        Create a chatbot for another session without reloading KPI data
+
+        The new bot shares this bot's data loader, chart generator and OpenAI
+        client, but keeps its own session state and conversation history.
+        """
+        bot = copy.copy(self)
+        bot.ai_client = copy.copy(self.ai_client)
+        bot.ai_client.clear_conversation()
+        bot.session_id = None
+        bot.session_start_time = None
+        bot.total_questions = 0
+        return bot
+
     def _get_welcome_message(self) -> str:
         """Generate welcome message with KPI data summary"""
         if not self.data_loader.kpi_data:
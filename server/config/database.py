@@ -4,17 +4,26 @@ Handles database connection setup and configuration management
 """
 
 import os
+import threading
 import psycopg2
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.extensions import DECIMAL, new_type, register_type
+from psycopg2.pool import ThreadedConnectionPool
 from contextlib import contextmanager
 import logging
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.pool import QueuePool
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Read NUMERIC as float instead of decimal.Decimal; KPI math is float-based anyway
+DEC2FLOAT = new_type(
+    DECIMAL.values,
+    'DEC2FLOAT',
+    lambda value, cursor: float(value) if value is not None else None
+)
+
 class DatabaseConfig:
     """Database configuration and connection management"""
 
@@ -28,8 +37,9 @@ class DatabaseConfig:
             'password': os.getenv('DB_PASSWORD')
         }
 
-        # Connection pool
+        # Connection pool, shared by request handlers and extractor worker threads
         self.connection_pool = None
+        self._pool_lock = threading.Lock()
         self.min_connections = 1
         self.max_connections = 10
 
@@ -39,11 +49,14 @@ class DatabaseConfig:
     def initialize_pool(self):
         """Initialize database connection pool"""
         try:
-            self.connection_pool = SimpleConnectionPool(
-                self.min_connections,
-                self.max_connections,
-                **self.db_config
-            )
+            with self._pool_lock:
+                if self.connection_pool:
+                    return
+                self.connection_pool = ThreadedConnectionPool(
+                    self.min_connections,
+                    self.max_connections,
+                    **self.db_config
+                )
             logger.info("Database connection pool initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize database pool: {e}")
@@ -91,12 +104,20 @@ class DatabaseConfig:
             self._engine = create_engine(
                 connection_string,
                 poolclass=QueuePool,
-                pool_size=5,
-                max_overflow=10,
-                pool_pre_ping=True
+                # Sized for the safety extractor's per-KPI fan-out running alongside the other extractors
+                pool_size=10,
+                max_overflow=20,
+                pool_pre_ping=True,
+                pool_recycle=1800
             )
+            event.listen(self._engine, 'connect', self._register_numeric_as_float)
         return self._engine
 
+    @staticmethod
+    def _register_numeric_as_float(dbapi_connection, connection_record):
+        """Apply the NUMERIC -> float typecaster to each new pooled connection"""
+        register_type(DEC2FLOAT, dbapi_connection)
+
     def close_pool(self):
         """Close all connections in the pool"""
         if self.connection_pool:
@@ -0,0 +1,94 @@
+"""
+Base KPI Extractor
+Engine handling and the per-date-range result memo shared by the operations, safety and combined KPI extractors
+"""
+
+import sys
+import os
+import copy
+import time
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from config.database import db
+
+logger = logging.getLogger(__name__)
+
+class BaseKPIExtractor:
+    """
+    Common setup for the KPI extractors: the db handle, a lazily resolved SQLAlchemy engine
+    and extract_all_kpis memoized per date range around each subclass's _extract_all_kpis
+    """
+
+    # Label used in log messages ("Operations", "Safety", ...)
+    KPI_GROUP = "KPI"
+
+    # Completed extractions are reused for the same date range for this long
+    CACHE_TTL_SECONDS = int(os.getenv("KPI_CACHE_TTL", "600"))
+    CACHE_MAX_ENTRIES = 64
+
+    def __init__(self, engine=None, cache_ttl: Optional[int] = None):
+        """cache_ttl overrides CACHE_TTL_SECONDS; 0 disables the memo for callers that cache results themselves"""
+        self.db = db
+        self._engine = engine
+        self.cache_ttl = self.CACHE_TTL_SECONDS if cache_ttl is None else cache_ttl
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+    @property
+    def engine(self):
+        """SQLAlchemy engine, resolved once (or injected) and shared by every KPI query"""
+        if self._engine is None:
+            self._engine = self.db.get_engine()
+        return self._engine
+
+    def extract_all_kpis(self, start_date: str = None, end_date: str = None) -> Dict:
+        """
+        Extract all KPIs of this group for the specified date range
+
+        Args:
+            start_date: Start date in YYYY-MM-DD format (default: 1 year ago)
+            end_date: End date in YYYY-MM-DD format (default: today)
+
+        Returns:
+            Dictionary containing all KPI metrics; each caller gets its own copy
+        """
+        if not start_date:
+            start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
+        if not end_date:
+            end_date = datetime.now().strftime('%Y-%m-%d')
+
+        if self.cache_ttl <= 0:
+            return self._extract_all_kpis(start_date, end_date)
+
+        cache_key = (start_date, end_date)
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+            if cached and cached[0] > time.monotonic():
+                logger.info(f"Using cached {self.KPI_GROUP} KPIs for {start_date} to {end_date}")
+                return copy.deepcopy(cached[1])
+
+        kpis = self._extract_all_kpis(start_date, end_date)
+
+        # Only cache complete results so a transient DB error isn't served for the whole TTL
+        if not any(isinstance(section, dict) and 'error' in section for section in kpis.values()):
+            with self._cache_lock:
+                self._cache.pop(cache_key, None)
+                if len(self._cache) >= self.CACHE_MAX_ENTRIES:
+                    self._cache.pop(next(iter(self._cache)))
+                self._cache[cache_key] = (time.monotonic() + self.cache_ttl, copy.deepcopy(kpis))
+
+        return kpis
+
+    def clear_cache(self) -> None:
+        """Drop all memoized KPI results"""
+        with self._cache_lock:
+            self._cache.clear()
+        logger.info(f"{self.KPI_GROUP} KPI cache cleared")
+
+    def _extract_all_kpis(self, start_date: str, end_date: str) -> Dict:
+        """Run every KPI of this group for the date range (uncached)"""
+        raise NotImplementedError
@@ -16,9 +16,10 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from config.database import db
+from data_extractor.base_extractor import BaseKPIExtractor
+from data_extractor.json_utils import to_json_compatible
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 from typing import Dict
 import json
@@ -52,53 +53,13 @@ def safe_int(value, default=0):
     except (TypeError, ValueError):
         return default
 
-def clean_data_for_json(data):
-    """
-    Recursively clean data structure to ensure all float values are JSON serializable
-    Replaces inf, -inf, and NaN values with safe defaults
-    """
-    if isinstance(data, dict):
-        return {key: clean_data_for_json(value) for key, value in data.items()}
-    elif isinstance(data, list):
-        return [clean_data_for_json(item) for item in data]
-    elif isinstance(data, float):
-        return safe_float(data)
-    elif isinstance(data, (int, str, bool, type(None))):
-        return data
-    else:
-        # For pandas Series, numpy arrays, etc.
-        try:
-            if hasattr(data, 'to_dict'):
-                return clean_data_for_json(data.to_dict())
-            elif hasattr(data, 'tolist'):
-                return clean_data_for_json(data.tolist())
-            else:
-                return safe_float(data) if isinstance(data, (int, float)) else str(data)
-        except:
-            return str(data)
-
-class CombinedKPIExtractor:
+class CombinedKPIExtractor(BaseKPIExtractor):
     """Extract comprehensive combined operational and safety KPIs for overall logistics health analysis"""
     
-    def __init__(self):
-        self.db = db
-        
-    def extract_all_kpis(self, start_date: str = None, end_date: str = None) -> Dict:
-        """
-        Extract all combined KPIs for the specified date range
-        
-        Args:
-            start_date: Start date in YYYY-MM-DD format (default: 1 year ago)
-            end_date: End date in YYYY-MM-DD format (default: today)
-            
-        Returns:
-            Dictionary containing all combined KPI metrics
-        """
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
-        if not end_date:
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            
+    KPI_GROUP = "Combined"
+
+    def _extract_all_kpis(self, start_date: str, end_date: str) -> Dict:
+        """Run every combined KPI for the date range (uncached)"""
         logger.info(f"Extracting Combined KPIs from {start_date} to {end_date}")
         
         kpis = {
@@ -114,8 +75,8 @@ class CombinedKPIExtractor:
             # Removed driver_performance_index KPI due to data processing issues
         }
 
-        # Clean data to ensure JSON serialization compatibility
-        kpis = clean_data_for_json(kpis)
+        # Normalize to plain JSON types (NaN/inf -> null, numpy -> Python)
+        kpis = to_json_compatible(kpis)
 
         logger.info("Combined KPI extraction completed successfully")
         return kpis
@@ -159,7 +120,7 @@ class CombinedKPIExtractor:
         """
         
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty or df['total_trips'].iloc[0] == 0:
@@ -213,11 +174,11 @@ class CombinedKPIExtractor:
         AND t.actual_arrival_time IS NOT NULL
         GROUP BY d.driver_id, d.name, d.safety_score, d.fatigue_score
         HAVING COUNT(t.trip_id) >= 3
-        ORDER BY driver_risk_score ASC
+        ORDER BY driver_risk_score ASC, d.driver_id
         """
         
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
@@ -243,10 +204,10 @@ class CombinedKPIExtractor:
                 'total_drivers_analyzed': len(df),
                 'avg_risk_score': safe_float(df['driver_risk_score'].mean()),
                 'avg_tat_hours': safe_float(df['avg_tat_hours'].mean()),
-                'heatmap_data': clean_data_for_json(heatmap_data.to_dict('records')),
-                'driver_analysis': clean_data_for_json(df[['driver_name', 'safety_score', 'avg_tat_hours', 'avg_speed_kmph',
+                'heatmap_data': to_json_compatible(heatmap_data.to_dict('records')),
+                'driver_analysis': to_json_compatible(df[['driver_name', 'safety_score', 'avg_tat_hours', 'avg_speed_kmph',
                                      'risk_events', 'driver_risk_score']].round(2).to_dict('records')),
-                'high_risk_fast_drivers': clean_data_for_json(df[(df['driver_risk_score'] < 50) & (df['avg_tat_hours'] < 6)][
+                'high_risk_fast_drivers': to_json_compatible(df[(df['driver_risk_score'] < 50) & (df['avg_tat_hours'] < 6)][
                     ['driver_name', 'driver_risk_score', 'avg_tat_hours', 'avg_speed_kmph']
                 ].to_dict('records'))
             }
@@ -310,19 +271,19 @@ class CombinedKPIExtractor:
             -- Risk-weighted efficiency (combines both metrics)
             (efficiency_score * (safety_score / 100)) as risk_weighted_efficiency
         FROM route_metrics
-        ORDER BY risk_weighted_efficiency DESC
+        ORDER BY risk_weighted_efficiency DESC, route_id
         LIMIT 10
         """
 
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
                 return {'top_routes': [], 'analysis': {}}
 
             return {
-                'top_10_routes': clean_data_for_json(df.round(2).to_dict('records')),
+                'top_10_routes': to_json_compatible(df.round(2).to_dict('records')),
                 'avg_risk_weighted_efficiency': safe_float(df['risk_weighted_efficiency'].mean()),
                 'best_route': {
                     'route': f"{df.iloc[0]['origin']} → {df.iloc[0]['destination']}",
@@ -397,11 +358,12 @@ class CombinedKPIExtractor:
             COUNT(CASE WHEN volume_fulfillment_pct >= 95 THEN 1 END) as high_volume_fulfillment_trips
         FROM trip_eligibility
         GROUP BY driver_name, transporter_name, is_rr_eligible, safety_score, fatigue_score, safety_violations, volume_fulfillment_pct
-        ORDER BY is_rr_eligible DESC, safety_score DESC
+        ORDER BY is_rr_eligible DESC, safety_score DESC, driver_name, transporter_name,
+                 fatigue_score, safety_violations, volume_fulfillment_pct
         """
 
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
@@ -428,8 +390,8 @@ class CombinedKPIExtractor:
                 'rr_eligibility_rate': round(rr_eligibility_rate, 2),
                 'total_trips_analyzed': safe_int(total_trips),
                 'rr_eligible_trips': safe_int(rr_eligible_trips),
-                'top_rr_drivers': clean_data_for_json(driver_rr_performance.head(10).round(2).to_dict('records')),
-                'top_rr_transporters': clean_data_for_json(transporter_rr_performance.head(10).to_dict('records')),
+                'top_rr_drivers': to_json_compatible(driver_rr_performance.head(10).round(2).to_dict('records')),
+                'top_rr_transporters': to_json_compatible(transporter_rr_performance.head(10).to_dict('records')),
                 'rr_criteria_breakdown': {
                     'on_time_trips': safe_int(df['on_time_trips'].sum()),
                     'high_safety_score_trips': safe_int(df['high_safety_score_trips'].sum()),
@@ -474,11 +436,11 @@ class CombinedKPIExtractor:
             AND c.submission_time <= %(end_date)s
         GROUP BY d.driver_id, d.name, d.safety_score, d.fatigue_score, d.engagement_index
         HAVING COUNT(DISTINCT t.trip_id) > 0
-        ORDER BY composite_engagement_score DESC
+        ORDER BY composite_engagement_score DESC, d.driver_id
         """
 
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
@@ -549,11 +511,11 @@ class CombinedKPIExtractor:
         LEFT JOIN missed_deliveries md ON t.trip_id = md.trip_id
         GROUP BY tr.transporter_id, tr.name, tr.composite_score
         HAVING COUNT(t.trip_id) > 0
-        ORDER BY calculated_composite_score DESC
+        ORDER BY calculated_composite_score DESC, tr.transporter_id
         """
 
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
@@ -635,11 +597,11 @@ class CombinedKPIExtractor:
         AND t.status = 'Completed'
         AND d.fatigue_score IS NOT NULL
         GROUP BY r.route_id, r.origin, r.destination, r.distance_km, departure_hour, time_period, route_length_category, d.fatigue_score
-        ORDER BY fatigue_risk_score ASC
+        ORDER BY fatigue_risk_score ASC, r.route_id, departure_hour, d.fatigue_score
         """
 
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
@@ -738,12 +700,12 @@ class CombinedKPIExtractor:
         LEFT JOIN missed_deliveries md ON t.trip_id = md.trip_id
         GROUP BY d.driver_id, d.name, d.safety_score, d.fatigue_score, d.engagement_index
         HAVING COUNT(t.trip_id) >= 3
-        ORDER BY driver_performance_index DESC
+        ORDER BY driver_performance_index DESC, d.driver_id
         """
 
         try:
             logger.info(f"Starting driver performance index KPI calculation for {start_date} to {end_date}")
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
             logger.info(f"Query executed successfully. DataFrame shape: {df.shape}")
 
@@ -806,7 +768,7 @@ class CombinedKPIExtractor:
                     numeric_cols = detail_df.select_dtypes(include=['number']).columns
                     detail_df[numeric_cols] = detail_df[numeric_cols].round(2)
                     driver_performance_details = detail_df.to_dict('records')
-                    driver_performance_details = clean_data_for_json(driver_performance_details)
+                    driver_performance_details = to_json_compatible(driver_performance_details)
                 else:
                     driver_performance_details = []
             except Exception as detail_error:
@@ -823,7 +785,7 @@ class CombinedKPIExtractor:
                     numeric_cols = top_df.select_dtypes(include=['number']).columns
                     top_df[numeric_cols] = top_df[numeric_cols].round(2)
                     top_performers = top_df.to_dict('records')
-                    top_performers = clean_data_for_json(top_performers)
+                    top_performers = to_json_compatible(top_performers)
                 else:
                     top_performers = []
             except Exception as top_error:
@@ -839,7 +801,7 @@ class CombinedKPIExtractor:
                     numeric_cols = bottom_df.select_dtypes(include=['number']).columns
                     bottom_df[numeric_cols] = bottom_df[numeric_cols].round(2)
                     bottom_performers = bottom_df.to_dict('records')
-                    bottom_performers = clean_data_for_json(bottom_performers)
+                    bottom_performers = to_json_compatible(bottom_performers)
                 else:
                     bottom_performers = []
             except Exception as bottom_error:
@@ -857,7 +819,7 @@ class CombinedKPIExtractor:
                         numeric_cols = improvement_df.select_dtypes(include=['number']).columns
                         improvement_df[numeric_cols] = improvement_df[numeric_cols].round(2)
                         improvement_needed = improvement_df.to_dict('records')
-                        improvement_needed = clean_data_for_json(improvement_needed)
+                        improvement_needed = to_json_compatible(improvement_needed)
                     else:
                         improvement_needed = []
                 else:
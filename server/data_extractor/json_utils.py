@@ -0,0 +1,17 @@
+"""
+JSON helpers shared by the KPI extractors
+"""
+
+import orjson
+
+def to_json_compatible(data):
+    """
+    Normalize a KPI payload into plain JSON types in a single C-level pass
+    NaN/inf become None (JSON null), numpy scalars/arrays become Python values
+    and anything else orjson can't encode natively (Timestamps, Decimals) is stringified
+    """
+    return orjson.loads(orjson.dumps(
+        data,
+        default=str,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    ))
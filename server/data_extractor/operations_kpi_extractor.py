@@ -21,9 +21,10 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from config.database import db
+from data_extractor.base_extractor import BaseKPIExtractor
+from data_extractor.json_utils import to_json_compatible
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 from typing import Dict, List, Optional, Tuple
 import json
@@ -57,53 +58,13 @@ def safe_int(value, default=0):
     except (TypeError, ValueError):
         return default
 
-def clean_data_for_json(data):
-    """
-    Recursively clean data structure to ensure all float values are JSON serializable
-    Replaces inf, -inf, and NaN values with safe defaults
-    """
-    if isinstance(data, dict):
-        return {key: clean_data_for_json(value) for key, value in data.items()}
-    elif isinstance(data, list):
-        return [clean_data_for_json(item) for item in data]
-    elif isinstance(data, float):
-        return safe_float(data)
-    elif isinstance(data, (int, str, bool, type(None))):
-        return data
-    else:
-        # For pandas Series, numpy arrays, etc.
-        try:
-            if hasattr(data, 'to_dict'):
-                return clean_data_for_json(data.to_dict())
-            elif hasattr(data, 'tolist'):
-                return clean_data_for_json(data.tolist())
-            else:
-                return safe_float(data) if isinstance(data, (int, float)) else str(data)
-        except:
-            return str(data)
-
-class OperationsKPIExtractor:
+class OperationsKPIExtractor(BaseKPIExtractor):
     """Extract comprehensive operations KPIs for logistics efficiency analysis"""
     
-    def __init__(self):
-        self.db = db
-        
-    def extract_all_kpis(self, start_date: str = None, end_date: str = None) -> Dict:
-        """
-        Extract all operations KPIs for the specified date range
-        
-        Args:
-            start_date: Start date in YYYY-MM-DD format (default: 30 days ago)
-            end_date: End date in YYYY-MM-DD format (default: today)
-            
-        Returns:
-            Dictionary containing all KPI metrics
-        """
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
-        if not end_date:
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            
+    KPI_GROUP = "Operations"
+
+    def _extract_all_kpis(self, start_date: str, end_date: str) -> Dict:
+        """Run every operations KPI for the date range (uncached)"""
         logger.info(f"Extracting Operations KPIs from {start_date} to {end_date}")
         
         kpis = {
@@ -123,8 +84,8 @@ class OperationsKPIExtractor:
             'maintenance_downtime': self.get_maintenance_downtime_kpi(start_date, end_date)
         }
 
-        # Clean data to ensure JSON serialization compatibility
-        kpis = clean_data_for_json(kpis)
+        # Normalize to plain JSON types (NaN/inf -> null, numpy -> Python)
+        kpis = to_json_compatible(kpis)
 
         logger.info("Operations KPI extraction completed successfully")
         return kpis
@@ -147,11 +108,11 @@ class OperationsKPIExtractor:
         AND t.actual_departure_time IS NOT NULL
         AND t.actual_arrival_time IS NOT NULL
         GROUP BY l.type, l.name
-        ORDER BY avg_tat_hours DESC
+        ORDER BY avg_tat_hours DESC, l.type, l.name
         """
         
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
@@ -196,11 +157,11 @@ class OperationsKPIExtractor:
         AND t.actual_departure_time <= %(end_date)s
         AND t.status IN ('Completed', 'In Progress')
         GROUP BY v.vehicle_id, v.plate_number, v.type, DATE(t.actual_departure_time)
-        ORDER BY daily_trip_count DESC
+        ORDER BY daily_trip_count DESC, v.vehicle_id, trip_date
         """
         
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
                 
             if df.empty:
@@ -246,7 +207,7 @@ class OperationsKPIExtractor:
         """
 
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
@@ -309,11 +270,11 @@ class OperationsKPIExtractor:
             COUNT(*) as active_days
         FROM daily_utilization
         GROUP BY vehicle_id, plate_number, vehicle_type
-        ORDER BY avg_utilization_pct DESC
+        ORDER BY avg_utilization_pct DESC, vehicle_id
         """
 
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
@@ -358,7 +319,7 @@ class OperationsKPIExtractor:
         """
 
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
@@ -429,7 +390,7 @@ class OperationsKPIExtractor:
         """
 
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
@@ -482,11 +443,11 @@ class OperationsKPIExtractor:
         LEFT JOIN missed_deliveries md ON t.trip_id = md.trip_id
         GROUP BY tr.transporter_id, tr.name, tr.composite_score
         HAVING COUNT(t.trip_id) > 0
-        ORDER BY on_time_rate_pct DESC, volume_fulfillment_pct DESC
+        ORDER BY on_time_rate_pct DESC, volume_fulfillment_pct DESC, tr.transporter_id
         """
 
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
@@ -537,11 +498,11 @@ class OperationsKPIExtractor:
         JOIN drivers d ON t.driver_id = d.driver_id
         WHERE md.timestamp >= %(start_date)s
         AND md.timestamp <= %(end_date)s
-        ORDER BY md.timestamp DESC
+        ORDER BY md.timestamp DESC, md.id
         """
 
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
@@ -557,7 +518,7 @@ class OperationsKPIExtractor:
             AND actual_departure_time <= %(end_date)s
             """
 
-            engine = self.db.get_engine()
+            engine = self.engine
             total_trips_df = pd.read_sql_query(total_trips_query, engine, params={'start_date': start_date, 'end_date': end_date})
             total_trips = total_trips_df['total_trips'].iloc[0] if not total_trips_df.empty else 1
 
@@ -598,11 +559,11 @@ class OperationsKPIExtractor:
         WHERE te.event_time >= %(start_date)s
         AND te.event_time <= %(end_date)s
         AND te.type IN ('geo_deviation', 'off_route', 'route_violation')
-        ORDER BY te.event_time DESC
+        ORDER BY te.event_time DESC, te.event_id
         """
 
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
@@ -666,7 +627,7 @@ class OperationsKPIExtractor:
         """
 
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
@@ -725,7 +686,7 @@ class OperationsKPIExtractor:
         """
 
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
             if df.empty:
@@ -769,11 +730,11 @@ class OperationsKPIExtractor:
         FROM vehicles v
         WHERE v.maintenance_downtime_hrs IS NOT NULL
         AND v.last_maintenance_date IS NOT NULL
-        ORDER BY v.maintenance_downtime_hrs DESC
+        ORDER BY v.maintenance_downtime_hrs DESC, v.vehicle_id
         """
 
         try:
-            engine = self.db.get_engine()
+            engine = self.engine
             df = pd.read_sql_query(query, engine)
 
             if df.empty:
@@ -866,7 +827,7 @@ if __name__ == "__main__":
         FROM vehicles v
         WHERE v.maintenance_downtime_hrs IS NOT NULL
         AND v.last_maintenance_date IS NOT NULL
-        ORDER BY v.maintenance_downtime_hrs DESC
+        ORDER BY v.maintenance_downtime_hrs DESC, v.vehicle_id
         """
 
         # Also get trip-based availability analysis
@@ -898,7 +859,7 @@ if __name__ == "__main__":
             GROUP BY vehicle_id, plate_number, vehicle_type
         )
         SELECT * FROM vehicle_availability
-        ORDER BY availability_pct ASC
+        ORDER BY availability_pct ASC, vehicle_id
         """
 
         try:
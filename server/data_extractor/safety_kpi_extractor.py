@@ -20,18 +20,32 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from config.database import db
+from data_extractor.base_extractor import BaseKPIExtractor
+from data_extractor.json_utils import to_json_compatible
 import pandas as pd
-from datetime import datetime, timedelta
+import numpy as np
+import orjson
+from datetime import datetime
 import logging
-from typing import Dict, List, Optional, Tuple
-import json
+from typing import Dict, Iterator, List, Optional, Tuple
 import math
+import asyncio
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import connectorx as cx
+except ImportError:  # optional: Arrow transport for wide per-driver result sets
+    cx = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# export_kpis_to_json writes next to the data_extractor package (the server directory)
+_OUT_DIR = Path(__file__).resolve().parent.parent
+
 def safe_float(value, default=0.0):
     """
     Safely convert a value to float, handling inf, -inf, and NaN values
@@ -56,86 +70,227 @@ def safe_int(value, default=0):
     except (TypeError, ValueError):
         return default
 
-def clean_data_for_json(data):
+def round_record(record: Dict, columns: List[str], decimals: Optional[int] = 2) -> Dict:
     """
-    Recursively clean data structure to ensure all float values are JSON serializable
-    Replaces inf, -inf, and NaN values with safe defaults
+    Project a row dict onto the given columns, rounding float values like DataFrame.round
+    Pass decimals=None to keep the values as-is
     """
-    if isinstance(data, dict):
-        return {key: clean_data_for_json(value) for key, value in data.items()}
-    elif isinstance(data, list):
-        return [clean_data_for_json(item) for item in data]
-    elif isinstance(data, float):
-        return safe_float(data)
-    elif isinstance(data, (int, str, bool, type(None))):
-        return data
-    else:
-        # For pandas Series, numpy arrays, etc.
-        try:
-            if hasattr(data, 'to_dict'):
-                return clean_data_for_json(data.to_dict())
-            elif hasattr(data, 'tolist'):
-                return clean_data_for_json(data.tolist())
-            else:
-                return safe_float(data) if isinstance(data, (int, float)) else str(data)
-        except:
-            return str(data)
-
-class SafetyKPIExtractor:
+    if decimals is None:
+        return {column: record[column] for column in columns}
+    return {
+        column: round(record[column], decimals) if isinstance(record[column], float) else record[column]
+        for column in columns
+    }
+
+def push_top_k(heap: List, k: int, key, seq: int, item) -> None:
+    """
+    Keep the k items with the largest keys seen so far in a min-heap of (key, -seq, item)
+    Ties go to the earliest item, matching heapq.nlargest
+    """
+    entry = (key, -seq, item)
+    if len(heap) < k:
+        heapq.heappush(heap, entry)
+    elif entry[:2] > heap[0][:2]:
+        heapq.heapreplace(heap, entry)
+
+def frame_records(df: pd.DataFrame, columns: Optional[List[str]] = None, decimals: Optional[int] = 2) -> List[Dict]:
+    """
+    Convert DataFrame columns to a list of row dicts, rounding float columns like DataFrame.round
+    Works column-wise on the numpy arrays, avoiding the rounded copy and per-cell work of to_dict('records')
+    """
+    columns = list(df.columns) if columns is None else columns
+    values = []
+    for column in columns:
+        series = df[column]
+        if decimals is not None and series.dtype.kind == 'f':
+            values.append(np.round(series.to_numpy(), decimals).tolist())
+        else:
+            values.append(series.tolist())
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+def category_counts(categorical: pd.Series) -> Dict[str, int]:
+    """Count a categorical column with np.bincount over its codes, in category order, skipping empty categories"""
+    categories = categorical.cat.categories.tolist()
+    counts = np.bincount(categorical.cat.codes.to_numpy(), minlength=len(categories))
+    return {category: count for category, count in zip(categories, counts.tolist()) if count}
+
+class SafetyKPIExtractor(BaseKPIExtractor):
     """Extract comprehensive safety KPIs for driver behavior and risk evaluation"""
-    
-    def __init__(self):
-        self.db = db
-        
-    def extract_all_kpis(self, start_date: str = None, end_date: str = None) -> Dict:
+
+    # KPI sections in output order, mapped to the method that computes each one
+    KPI_METHODS = (
+        ('driving_safety_score', 'get_driving_safety_score_kpi'),
+        ('phone_usage_rate', 'get_phone_usage_rate_kpi'),
+        ('overspeeding_events', 'get_overspeeding_events_kpi'),
+        ('harsh_driving_events', 'get_harsh_driving_events_kpi'),
+        ('rest_time_compliance', 'get_rest_time_compliance_kpi'),
+        ('high_risk_trips', 'get_high_risk_trips_kpi'),
+        ('incident_heatmaps', 'get_incident_heatmaps_kpi'),
+        ('repeat_offenders', 'get_repeat_offenders_kpi'),
+        ('checklist_compliance', 'get_checklist_compliance_kpi'),
+        ('accident_near_miss_flags', 'get_accident_near_miss_flags_kpi'),
+        ('fatigue_scoring', 'get_fatigue_scoring_kpi')
+    )
+
+    # Newest incidents returned in full by the accident/near-miss KPI (one dashboard page);
+    # total_incidents still counts every incident in the range
+    INCIDENT_DETAILS_LIMIT = 200
+
+    KPI_GROUP = "Safety"
+
+    def __init__(self, engine=None, cache_ttl: Optional[int] = None):
+        super().__init__(engine, cache_ttl)
+        self._has_postgis = None
+        self._has_kpi_rollup = None
+        # One pool for the KPI fan-out, reused by every extraction; threads start on first use
+        self._kpi_executor = ThreadPoolExecutor(max_workers=len(self.KPI_METHODS), thread_name_prefix="safety-kpi")
+        # connectorx connection string, rendered once; it carries the password, so never log it
+        self._cx_url = None
+
+    def _probe(self, sql: str, conn=None) -> bool:
+        """Run a one-value catalog check on conn, or on a pooled connection when none is given"""
+        if conn is None:
+            with self.engine.connect() as conn:
+                return bool(conn.exec_driver_sql(sql).scalar())
+        return bool(conn.exec_driver_sql(sql).scalar())
+
+    def has_postgis(self, conn=None) -> bool:
+        """Whether PostGIS is installed in the KPI database (checked once, on the caller's connection)"""
+        if self._has_postgis is None:
+            try:
+                self._has_postgis = self._probe("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'postgis')", conn)
+            except Exception as e:
+                if conn is not None:
+                    conn.rollback()
+                logger.warning(f"Could not detect PostGIS, clustering incidents on a coordinate grid: {e}")
+                self._has_postgis = False
+        return self._has_postgis
+
+    def has_kpi_rollup(self, conn=None) -> bool:
+        """Whether the driver_kpi_daily rollup table exists (checked once, on the caller's connection)"""
+        if self._has_kpi_rollup is None:
+            try:
+                self._has_kpi_rollup = self._probe("SELECT to_regclass('driver_kpi_daily') IS NOT NULL", conn)
+            except Exception as e:
+                if conn is not None:
+                    conn.rollback()
+                logger.warning(f"Could not detect driver_kpi_daily, reading raw trip events: {e}")
+                self._has_kpi_rollup = False
+        return self._has_kpi_rollup
+
+    def _read_sql(self, query: str, params: Dict, conn=None, dtype: Optional[Dict] = None) -> pd.DataFrame:
         """
-        Extract all safety KPIs for the specified date range
-        
-        Args:
-            start_date: Start date in YYYY-MM-DD format (default: 1 year ago)
-            end_date: End date in YYYY-MM-DD format (default: today)
-            
-        Returns:
-            Dictionary containing all safety KPI metrics
+        Run a KPI query and sanitize +/-inf to NaN at the DataFrame boundary
+        Uses the given connection when provided, otherwise checks one out of the engine pool
+        Pass dtype to declare column types up front instead of relying on pandas inference
+        """
+        df = pd.read_sql_query(query, conn if conn is not None else self.engine, params=params, dtype=dtype)
+        return df.replace([np.inf, -np.inf], np.nan)
+
+    def _connectorx_url(self) -> str:
+        """The engine's database as a plain postgresql:// URL for connectorx (built on first use)"""
+        if self._cx_url is None:
+            self._cx_url = self.engine.url.set(drivername='postgresql').render_as_string(hide_password=False)
+        return self._cx_url
+
+    def _read_sql_arrow(self, query: str, params: Dict, conn=None, dtype: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        Run a wide KPI query through connectorx, which reads PostgreSQL's binary protocol straight into Arrow
+        connectorx takes no bind parameters, so they are rendered client-side by psycopg2 first
+        Falls back to _read_sql when connectorx is not installed
         """
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
-        if not end_date:
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            
+        if cx is None:
+            return self._read_sql(query, params, conn, dtype)
+        if conn is None:
+            with self.engine.connect() as conn:
+                return self._read_sql_arrow(query, params, conn, dtype)
+
+        with conn.connection.cursor() as cursor:
+            sql = cursor.mogrify(query, params).decode()
+        try:
+            table = cx.read_sql(self._connectorx_url(), sql, return_type='arrow')
+        except Exception as e:
+            # connectorx errors can echo the connection string; re-raise without it (or the original chain)
+            message = str(e)
+            if self.engine.url.password:
+                message = message.replace(str(self.engine.url.password), '***')
+            raise RuntimeError(f"connectorx read failed: {message}") from None
+        df = table.to_pandas()
+        if dtype:
+            df = df.astype(dtype)
+        return df.replace([np.inf, -np.inf], np.nan)
+
+    def _fetch_rows(self, query: str, params: Dict, conn=None) -> List[Dict]:
+        """Run a KPI query and return its rows as plain dicts, skipping DataFrame construction"""
+        if conn is not None:
+            return [dict(row) for row in conn.exec_driver_sql(query, params).mappings()]
+        with self.engine.connect() as conn:
+            return [dict(row) for row in conn.exec_driver_sql(query, params).mappings()]
+
+    def _stream_rows(self, query: str, params: Dict, conn=None, batch_size: int = 5000) -> Iterator[Dict]:
+        """
+        Yield KPI query rows as plain dicts through a server-side cursor, batch_size rows at a time
+        Keeps large driver rollups from being buffered whole on the client before they are processed
+        """
+        if conn is None:
+            with self.engine.connect() as conn:
+                yield from self._stream_rows(query, params, conn, batch_size)
+            return
+        result = conn.exec_driver_sql(
+            query, params, execution_options={'stream_results': True, 'yield_per': batch_size}
+        )
+        for row in result.mappings():
+            yield dict(row)
+
+    def _run_kpi(self, method_name: str, start_date: str, end_date: str) -> Dict:
+        """Run one KPI method on a single pooled connection shared by all of its queries"""
+        try:
+            with self.engine.connect() as conn:
+                return getattr(self, method_name)(start_date, end_date, conn=conn)
+        except Exception as e:
+            logger.error(f"Error running {method_name}: {e}")
+            return {'error': str(e)}
+
+    async def extract_all_kpis_async(self, start_date: str = None, end_date: str = None) -> Dict:
+        """
+        Awaitable extract_all_kpis for event-loop callers
+        Runs in a worker thread so the loop stays free while the KPI queries fan out on the pool
+        """
+        return await asyncio.to_thread(self.extract_all_kpis, start_date, end_date)
+
+    def _extract_all_kpis(self, start_date: str, end_date: str) -> Dict:
+        """Run every safety KPI for the date range (uncached)"""
         logger.info(f"Extracting Safety KPIs from {start_date} to {end_date}")
         
         kpis = {
             'extraction_timestamp': datetime.now().isoformat(),
-            'date_range': {'start': start_date, 'end': end_date},
-            'driving_safety_score': self.get_driving_safety_score_kpi(start_date, end_date),
-            'phone_usage_rate': self.get_phone_usage_rate_kpi(start_date, end_date),
-            'overspeeding_events': self.get_overspeeding_events_kpi(start_date, end_date),
-            'harsh_driving_events': self.get_harsh_driving_events_kpi(start_date, end_date),
-            'rest_time_compliance': self.get_rest_time_compliance_kpi(start_date, end_date),
-            'high_risk_trips': self.get_high_risk_trips_kpi(start_date, end_date),
-            'incident_heatmaps': self.get_incident_heatmaps_kpi(start_date, end_date),
-            'repeat_offenders': self.get_repeat_offenders_kpi(start_date, end_date),
-            'checklist_compliance': self.get_checklist_compliance_kpi(start_date, end_date),
-            'accident_near_miss_flags': self.get_accident_near_miss_flags_kpi(start_date, end_date),
-            'fatigue_scoring': self.get_fatigue_scoring_kpi(start_date, end_date)
+            'date_range': {'start': start_date, 'end': end_date}
         }
 
-        # Clean data to ensure JSON serialization compatibility
-        kpis = clean_data_for_json(kpis)
+        # The KPI queries are independent, so issue them concurrently on the shared
+        # connection pool; total wall time becomes the slowest query, not the sum
+        futures = {
+            name: self._kpi_executor.submit(self._run_kpi, method, start_date, end_date)
+            for name, method in self.KPI_METHODS
+        }
+        for name, future in futures.items():
+            kpis[name] = future.result()
+
+        # Normalize to plain JSON types (NaN/inf -> null, numpy -> Python)
+        kpis = to_json_compatible(kpis)
 
         logger.info("Safety KPI extraction completed successfully")
         return kpis
     
-    def get_driving_safety_score_kpi(self, start_date: str, end_date: str) -> Dict:
+    def get_driving_safety_score_kpi(self, start_date: str, end_date: str, conn=None) -> Dict:
         """Calculate overall driving safety score for all drivers"""
         query = """
         SELECT
             d.driver_id,
             d.name as driver_name,
-            d.safety_score,
+            d.safety_score::float8 as safety_score,
             COUNT(t.trip_id) as total_trips,
-            AVG(d.safety_score) OVER() as avg_safety_score,
+            AVG(d.safety_score) OVER()::float8 as avg_safety_score,
             RANK() OVER(ORDER BY d.safety_score DESC) as safety_rank
         FROM drivers d
         LEFT JOIN trips t ON d.driver_id = t.driver_id
@@ -143,25 +298,16 @@ class SafetyKPIExtractor:
             AND t.actual_departure_time <= %(end_date)s
             AND t.status = 'Completed'
         WHERE d.safety_score IS NOT NULL
-        GROUP BY d.driver_id, d.name, d.safety_score
+        GROUP BY d.driver_id
         HAVING COUNT(t.trip_id) > 0
-        ORDER BY d.safety_score DESC
+        ORDER BY d.safety_score DESC, d.driver_id
         """
         
         try:
-            engine = self.db.get_engine()
-            df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
-
-            if df.empty:
-                return {
-                    'overall_avg_safety_score': 0,
-                    'driver_safety_scores': [],
-                    'safety_distribution': {}
-                }
-
-            # Convert numeric columns to proper types
-            df['safety_score'] = pd.to_numeric(df['safety_score'], errors='coerce')
-            df = df.dropna(subset=['safety_score'])
+            df = self._read_sql(
+                query, {'start_date': start_date, 'end_date': end_date}, conn,
+                dtype={'safety_score': 'float64', 'total_trips': 'int64', 'safety_rank': 'int64'}
+            )
 
             if df.empty:
                 return {
@@ -170,18 +316,20 @@ class SafetyKPIExtractor:
                     'safety_distribution': {}
                 }
 
-            # Safety score distribution
+            # Safety score distribution: bucket index per score (<60, 60-75, 75-90, >=90), counted in one pass
+            score_counts = np.bincount(np.digitize(df['safety_score'].to_numpy(), [60, 75, 90]), minlength=4)
             score_ranges = {
-                'excellent': len(df[df['safety_score'] >= 90]),
-                'good': len(df[(df['safety_score'] >= 75) & (df['safety_score'] < 90)]),
-                'average': len(df[(df['safety_score'] >= 60) & (df['safety_score'] < 75)]),
-                'poor': len(df[df['safety_score'] < 60])
+                'excellent': int(score_counts[3]),
+                'good': int(score_counts[2]),
+                'average': int(score_counts[1]),
+                'poor': int(score_counts[0])
             }
+            score_stats = df['safety_score'].agg(['mean', 'max', 'min'])
 
             return {
-                'overall_avg_safety_score': safe_float(df['safety_score'].mean()),
-                'highest_safety_score': safe_float(df['safety_score'].max()),
-                'lowest_safety_score': safe_float(df['safety_score'].min()),
+                'overall_avg_safety_score': safe_float(score_stats['mean']),
+                'highest_safety_score': safe_float(score_stats['max']),
+                'lowest_safety_score': safe_float(score_stats['min']),
                 'total_drivers': len(df),
                 'driver_safety_scores': df[['driver_name', 'safety_score', 'total_trips', 'safety_rank']].to_dict('records'),
                 'safety_distribution': score_ranges,
@@ -192,259 +340,335 @@ class SafetyKPIExtractor:
             logger.error(f"Error calculating driving safety score KPI: {e}")
             return {'error': str(e)}
     
-    def get_phone_usage_rate_kpi(self, start_date: str, end_date: str) -> Dict:
+    def get_phone_usage_rate_kpi(self, start_date: str, end_date: str, conn=None) -> Dict:
         """Calculate phone usage during trip incidence rate"""
         query = """
-        SELECT
-            te.trip_id,
-            t.driver_id,
-            d.name as driver_name,
-            COUNT(CASE WHEN te.type = 'phone_usage' THEN 1 END) as phone_usage_events,
-            COUNT(*) as total_events,
-            EXTRACT(EPOCH FROM (t.actual_arrival_time - t.actual_departure_time))/3600 as trip_duration_hours,
-            t.actual_distance_km
-        FROM trip_events te
-        JOIN trips t ON te.trip_id = t.trip_id
-        JOIN drivers d ON t.driver_id = d.driver_id
-        WHERE te.event_time >= %(start_date)s
-        AND te.event_time <= %(end_date)s
-        AND t.status = 'Completed'
-        AND t.actual_departure_time IS NOT NULL
-        AND t.actual_arrival_time IS NOT NULL
-        GROUP BY te.trip_id, t.driver_id, d.name, t.actual_arrival_time, t.actual_departure_time, t.actual_distance_km
+        WITH per_trip AS (
+            SELECT
+                t.trip_id,
+                t.driver_id,
+                COUNT(*) FILTER (WHERE te.type = 'phone_usage') as phone_usage_events,
+                EXTRACT(EPOCH FROM (t.actual_arrival_time - t.actual_departure_time))/3600 as trip_duration_hours
+            FROM trip_events te
+            JOIN trips t ON te.trip_id = t.trip_id
+            WHERE te.event_time >= %(start_date)s
+            AND te.event_time <= %(end_date)s
+            AND t.status = 'Completed'
+            AND t.actual_departure_time IS NOT NULL
+            AND t.actual_arrival_time IS NOT NULL
+            AND t.driver_id IS NOT NULL
+            GROUP BY t.trip_id
+        ),
+        driver_rollup AS (
+            SELECT
+                CASE WHEN GROUPING(driver_id) = 1 THEN 'summary' ELSE 'driver' END as row_kind,
+                driver_id,
+                SUM(phone_usage_events)::int as total_phone_events,
+                SUM(trip_duration_hours)::float8 as total_hours,
+                COUNT(*) as total_trips,
+                COUNT(*) FILTER (WHERE phone_usage_events > 0) as trips_with_phone_usage,
+                SUM(phone_usage_events)::float8 / NULLIF(SUM(trip_duration_hours), 0) as usage_rate_per_hour
+            FROM per_trip
+            GROUP BY GROUPING SETS ((driver_id), ())
+        )
+        SELECT r.*, d.name as driver_name
+        FROM driver_rollup r
+        LEFT JOIN drivers d ON r.driver_id = d.driver_id
+        ORDER BY r.row_kind DESC, r.driver_id
         """
-        
-        try:
-            engine = self.db.get_engine()
-            df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
 
-            if df.empty:
+        try:
+            driver_columns = ['driver_id', 'driver_name', 'total_phone_events', 'total_hours', 'total_trips', 'usage_rate_per_hour']
+            offender_columns = ['driver_name', 'total_phone_events', 'total_trips', 'usage_rate_per_hour']
+
+            # Single pass over the streamed rollup: the overall summary row, driver records and top offenders
+            summary = None
+            driver_analysis = []
+            worst_offenders = []
+            rows = self._stream_rows(query, {'start_date': start_date, 'end_date': end_date}, conn)
+            for seq, row in enumerate(rows):
+                if row['row_kind'] == 'summary':
+                    summary = row
+                    continue
+                driver_analysis.append(round_record(row, driver_columns))
+                if row['usage_rate_per_hour'] is not None:
+                    push_top_k(worst_offenders, 10, row['usage_rate_per_hour'], seq,
+                               round_record(row, offender_columns, None))
+
+            if not driver_analysis:
                 return {'phone_usage_incidence_rate': 0, 'analysis': {}}
 
-            # Calculate phone usage rate per trip
-            df['phone_usage_rate_per_trip'] = df['phone_usage_events'] / df['trip_duration_hours']
-            
-            # Calculate overall metrics
-            total_trips = len(df)
-            trips_with_phone_usage = len(df[df['phone_usage_events'] > 0])
+            total_trips = summary['total_trips']
+            trips_with_phone_usage = summary['trips_with_phone_usage']
             phone_usage_incidence_rate = (trips_with_phone_usage / total_trips * 100) if total_trips > 0 else 0
 
-            # Driver-level analysis
-            driver_analysis = df.groupby(['driver_id', 'driver_name']).agg({
-                'phone_usage_events': 'sum',
-                'trip_duration_hours': 'sum',
-                'trip_id': 'count'
-            }).reset_index()
-            
-            driver_analysis['phone_usage_rate_per_hour'] = driver_analysis['phone_usage_events'] / driver_analysis['trip_duration_hours']
-            driver_analysis.columns = ['driver_id', 'driver_name', 'total_phone_events', 'total_hours', 'total_trips', 'usage_rate_per_hour']
-
             return {
                 'phone_usage_incidence_rate': round(phone_usage_incidence_rate, 2),
                 'total_trips_analyzed': total_trips,
                 'trips_with_phone_usage': trips_with_phone_usage,
-                'avg_phone_events_per_trip': safe_float(df['phone_usage_events'].mean()),
-                'driver_analysis': driver_analysis.round(2).to_dict('records'),
-                'worst_offenders': driver_analysis.nlargest(10, 'usage_rate_per_hour')[
-                    ['driver_name', 'total_phone_events', 'total_trips', 'usage_rate_per_hour']
-                ].to_dict('records')
+                'avg_phone_events_per_trip': safe_float(summary['total_phone_events'] / total_trips) if total_trips > 0 else 0.0,
+                'driver_analysis': driver_analysis,
+                'worst_offenders': [record for _, _, record in sorted(worst_offenders, reverse=True)]
             }
         except Exception as e:
             logger.error(f"Error calculating phone usage rate KPI: {e}")
             return {'error': str(e)}
 
-    def get_overspeeding_events_kpi(self, start_date: str, end_date: str) -> Dict:
+    def get_overspeeding_events_kpi(self, start_date: str, end_date: str, conn=None) -> Dict:
         """Calculate overspeeding events per 100 km"""
         query = """
-        SELECT
-            te.trip_id,
-            t.driver_id,
-            d.name as driver_name,
-            t.actual_distance_km,
-            COUNT(CASE WHEN te.type = 'overspeeding' THEN 1 END) as overspeeding_events,
-            AVG(CASE WHEN te.type = 'overspeeding' THEN te.speed_kmph END) as avg_overspeed_kmph,
-            MAX(CASE WHEN te.type = 'overspeeding' THEN te.speed_kmph END) as max_overspeed_kmph
-        FROM trip_events te
-        JOIN trips t ON te.trip_id = t.trip_id
-        JOIN drivers d ON t.driver_id = d.driver_id
-        WHERE te.event_time >= %(start_date)s
-        AND te.event_time <= %(end_date)s
-        AND t.status = 'Completed'
-        AND t.actual_distance_km IS NOT NULL
-        AND t.actual_distance_km > 0
-        GROUP BY te.trip_id, t.driver_id, d.name, t.actual_distance_km
+        WITH per_trip AS (
+            SELECT
+                t.trip_id,
+                t.driver_id,
+                t.actual_distance_km,
+                COUNT(*) FILTER (WHERE te.type = 'overspeeding') as overspeeding_events,
+                AVG(te.speed_kmph) FILTER (WHERE te.type = 'overspeeding') as avg_overspeed_kmph,
+                MAX(te.speed_kmph) FILTER (WHERE te.type = 'overspeeding') as max_overspeed_kmph
+            FROM trip_events te
+            JOIN trips t ON te.trip_id = t.trip_id
+            WHERE te.event_time >= %(start_date)s
+            AND te.event_time <= %(end_date)s
+            AND t.status = 'Completed'
+            AND t.actual_distance_km IS NOT NULL
+            AND t.actual_distance_km > 0
+            AND t.driver_id IS NOT NULL
+            GROUP BY t.trip_id
+        ),
+        driver_rollup AS (
+            SELECT
+                CASE WHEN GROUPING(driver_id) = 1 THEN 'summary' ELSE 'driver' END as row_kind,
+                driver_id,
+                SUM(overspeeding_events)::int as total_overspeeding_events,
+                SUM(actual_distance_km)::float8 as total_distance_km,
+                AVG(avg_overspeed_kmph)::float8 as avg_overspeed_kmph,
+                MAX(max_overspeed_kmph)::float8 as max_overspeed_kmph,
+                COUNT(*) as total_trips,
+                SUM(overspeeding_events)::float8 / NULLIF(SUM(actual_distance_km), 0) * 100 as overspeeding_per_100km
+            FROM per_trip
+            GROUP BY GROUPING SETS ((driver_id), ())
+        )
+        SELECT r.*, d.name as driver_name
+        FROM driver_rollup r
+        LEFT JOIN drivers d ON r.driver_id = d.driver_id
+        ORDER BY r.row_kind DESC, r.driver_id
         """
 
-        try:
-            engine = self.db.get_engine()
-            df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
+        # Same driver rollup from the nightly driver_kpi_daily table (migrations/002),
+        # where trips are bucketed by departure day
+        rollup_query = """
+        WITH driver_rollup AS (
+            SELECT
+                CASE WHEN GROUPING(driver_id) = 1 THEN 'summary' ELSE 'driver' END as row_kind,
+                driver_id,
+                SUM(overspeeding_events)::int as total_overspeeding_events,
+                SUM(distance_km)::float8 as total_distance_km,
+                (SUM(overspeed_trip_avg_sum) / NULLIF(SUM(trips_with_overspeed), 0))::float8 as avg_overspeed_kmph,
+                MAX(max_overspeed_kmph)::float8 as max_overspeed_kmph,
+                SUM(trips)::int as total_trips,
+                SUM(overspeeding_events)::float8 / NULLIF(SUM(distance_km), 0) * 100 as overspeeding_per_100km
+            FROM driver_kpi_daily
+            WHERE day >= %(start_date)s::date
+            AND day <= %(end_date)s::date
+            GROUP BY GROUPING SETS ((driver_id), ())
+        )
+        SELECT r.*, d.name as driver_name
+        FROM driver_rollup r
+        LEFT JOIN drivers d ON r.driver_id = d.driver_id
+        ORDER BY r.row_kind DESC, r.driver_id
+        """
 
-            if df.empty:
+        try:
+            driver_columns = ['driver_id', 'driver_name', 'total_overspeeding_events', 'total_distance_km',
+                              'avg_overspeed_kmph', 'max_overspeed_kmph', 'total_trips', 'overspeeding_per_100km']
+            offender_columns = ['driver_name', 'total_overspeeding_events', 'total_distance_km', 'overspeeding_per_100km']
+
+            # Single pass over the streamed rollup: the overall summary row, driver records and top offenders
+            summary = None
+            driver_analysis = []
+            worst_offenders = []
+            rows = self._stream_rows(
+                rollup_query if self.has_kpi_rollup(conn) else query,
+                {'start_date': start_date, 'end_date': end_date},
+                conn
+            )
+            for seq, row in enumerate(rows):
+                if row['row_kind'] == 'summary':
+                    summary = row
+                    continue
+                driver_analysis.append(round_record(row, driver_columns))
+                if row['overspeeding_per_100km'] is not None:
+                    push_top_k(worst_offenders, 10, row['overspeeding_per_100km'], seq,
+                               round_record(row, offender_columns, None))
+
+            if not driver_analysis:
                 return {'overspeeding_events_per_100km': 0, 'analysis': {}}
 
-            # Calculate overspeeding events per 100km
-            df['overspeeding_per_100km'] = (df['overspeeding_events'] / df['actual_distance_km']) * 100
-
-            # Overall metrics
-            total_distance = df['actual_distance_km'].sum()
-            total_overspeeding_events = df['overspeeding_events'].sum()
-            overspeeding_per_100km = (total_overspeeding_events / total_distance * 100) if total_distance > 0 else 0
-
-            # Driver-level analysis
-            driver_analysis = df.groupby(['driver_id', 'driver_name']).agg({
-                'overspeeding_events': 'sum',
-                'actual_distance_km': 'sum',
-                'avg_overspeed_kmph': 'mean',
-                'max_overspeed_kmph': 'max',
-                'trip_id': 'count'
-            }).reset_index()
-
-            driver_analysis['overspeeding_per_100km'] = (driver_analysis['overspeeding_events'] / driver_analysis['actual_distance_km']) * 100
-            driver_analysis.columns = ['driver_id', 'driver_name', 'total_overspeeding_events', 'total_distance_km',
-                                     'avg_overspeed_kmph', 'max_overspeed_kmph', 'total_trips', 'overspeeding_per_100km']
-
             return {
-                'overspeeding_events_per_100km': round(overspeeding_per_100km, 2),
-                'total_overspeeding_events': safe_int(total_overspeeding_events),
-                'total_distance_analyzed_km': safe_float(total_distance),
-                'avg_overspeed_kmph': safe_float(df['avg_overspeed_kmph'].mean()),
-                'max_overspeed_recorded_kmph': safe_float(df['max_overspeed_kmph'].max()),
-                'driver_analysis': driver_analysis.round(2).to_dict('records'),
-                'worst_offenders': driver_analysis.nlargest(10, 'overspeeding_per_100km')[
-                    ['driver_name', 'total_overspeeding_events', 'total_distance_km', 'overspeeding_per_100km']
-                ].to_dict('records')
+                'overspeeding_events_per_100km': round(summary['overspeeding_per_100km'] or 0, 2),
+                'total_overspeeding_events': safe_int(summary['total_overspeeding_events']),
+                'total_distance_analyzed_km': safe_float(summary['total_distance_km']),
+                'avg_overspeed_kmph': safe_float(summary['avg_overspeed_kmph']),
+                'max_overspeed_recorded_kmph': safe_float(summary['max_overspeed_kmph']),
+                'driver_analysis': driver_analysis,
+                'worst_offenders': [record for _, _, record in sorted(worst_offenders, reverse=True)]
             }
         except Exception as e:
             logger.error(f"Error calculating overspeeding events KPI: {e}")
             return {'error': str(e)}
 
-    def get_harsh_driving_events_kpi(self, start_date: str, end_date: str) -> Dict:
+    def get_harsh_driving_events_kpi(self, start_date: str, end_date: str, conn=None) -> Dict:
         """Calculate harsh braking/acceleration/cornering events per trip"""
         query = """
+        WITH per_trip AS (
+            SELECT
+                t.trip_id,
+                t.driver_id,
+                COUNT(*) FILTER (WHERE te.type = 'harsh_braking') as harsh_braking_events,
+                COUNT(*) FILTER (WHERE te.type = 'harsh_acceleration') as harsh_acceleration_events,
+                COUNT(*) FILTER (WHERE te.type = 'harsh_cornering') as harsh_cornering_events,
+                COUNT(*) as total_harsh_events
+            FROM trip_events te
+            JOIN trips t ON te.trip_id = t.trip_id
+            WHERE te.event_time >= %(start_date)s
+            AND te.event_time <= %(end_date)s
+            AND t.status = 'Completed'
+            AND te.type IN ('harsh_braking', 'harsh_acceleration', 'harsh_cornering')
+            AND t.driver_id IS NOT NULL
+            GROUP BY t.trip_id
+        ),
+        driver_rollup AS (
+            SELECT
+                CASE WHEN GROUPING(driver_id) = 1 THEN 'summary' ELSE 'driver' END as row_kind,
+                driver_id,
+                SUM(harsh_braking_events)::int as total_harsh_braking,
+                SUM(harsh_acceleration_events)::int as total_harsh_acceleration,
+                SUM(harsh_cornering_events)::int as total_harsh_cornering,
+                SUM(total_harsh_events)::int as total_harsh_events,
+                -- per_trip holds one row per trip, so this is the distinct trip count
+                COUNT(*) as total_trips,
+                SUM(total_harsh_events)::float8 / COUNT(*) as harsh_events_per_trip
+            FROM per_trip
+            GROUP BY GROUPING SETS ((driver_id), ())
+        )
+        SELECT r.*, d.name as driver_name
+        FROM driver_rollup r
+        LEFT JOIN drivers d ON r.driver_id = d.driver_id
+        ORDER BY r.row_kind DESC, r.driver_id
+        """
+
+        # Severity breakdown rolled up separately so trips aren't split per severity
+        severity_query = """
         SELECT
-            te.trip_id,
-            t.driver_id,
-            d.name as driver_name,
-            COUNT(CASE WHEN te.type = 'harsh_braking' THEN 1 END) as harsh_braking_events,
-            COUNT(CASE WHEN te.type = 'harsh_acceleration' THEN 1 END) as harsh_acceleration_events,
-            COUNT(CASE WHEN te.type = 'harsh_cornering' THEN 1 END) as harsh_cornering_events,
-            COUNT(CASE WHEN te.type IN ('harsh_braking', 'harsh_acceleration', 'harsh_cornering') THEN 1 END) as total_harsh_events,
-            te.severity
+            te.severity,
+            COUNT(*) as harsh_events
         FROM trip_events te
         JOIN trips t ON te.trip_id = t.trip_id
-        JOIN drivers d ON t.driver_id = d.driver_id
         WHERE te.event_time >= %(start_date)s
         AND te.event_time <= %(end_date)s
         AND t.status = 'Completed'
         AND te.type IN ('harsh_braking', 'harsh_acceleration', 'harsh_cornering')
-        GROUP BY te.trip_id, t.driver_id, d.name, te.severity
+        AND te.severity IS NOT NULL
+        GROUP BY te.severity
+        ORDER BY te.severity
         """
 
         try:
-            engine = self.db.get_engine()
-            df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
-
-            if df.empty:
+            params = {'start_date': start_date, 'end_date': end_date}
+            driver_columns = ['driver_id', 'driver_name', 'total_harsh_braking', 'total_harsh_acceleration',
+                              'total_harsh_cornering', 'total_harsh_events', 'total_trips', 'harsh_events_per_trip']
+            offender_columns = ['driver_name', 'total_harsh_events', 'total_trips', 'harsh_events_per_trip']
+
+            # Single pass over the streamed rollup: the overall summary row, driver records and top offenders
+            summary = None
+            driver_analysis = []
+            worst_offenders = []
+            for seq, row in enumerate(self._stream_rows(query, params, conn)):
+                if row['row_kind'] == 'summary':
+                    summary = row
+                    continue
+                driver_analysis.append(round_record(row, driver_columns))
+                push_top_k(worst_offenders, 10, row['harsh_events_per_trip'], seq,
+                           round_record(row, offender_columns, None))
+
+            if not driver_analysis:
                 return {'harsh_events_per_trip': 0, 'analysis': {}}
 
-            # Calculate events per trip
-            trip_analysis = df.groupby('trip_id').agg({
-                'harsh_braking_events': 'sum',
-                'harsh_acceleration_events': 'sum',
-                'harsh_cornering_events': 'sum',
-                'total_harsh_events': 'sum'
-            }).reset_index()
-
-            # Driver-level analysis
-            driver_analysis = df.groupby(['driver_id', 'driver_name']).agg({
-                'harsh_braking_events': 'sum',
-                'harsh_acceleration_events': 'sum',
-                'harsh_cornering_events': 'sum',
-                'total_harsh_events': 'sum',
-                'trip_id': 'nunique'
-            }).reset_index()
-
-            driver_analysis['harsh_events_per_trip'] = driver_analysis['total_harsh_events'] / driver_analysis['trip_id']
-            driver_analysis.columns = ['driver_id', 'driver_name', 'total_harsh_braking', 'total_harsh_acceleration',
-                                     'total_harsh_cornering', 'total_harsh_events', 'total_trips', 'harsh_events_per_trip']
+            severity_df = self._read_sql(severity_query, params, conn)
 
             # Severity analysis
-            severity_analysis = df.groupby('severity')['total_harsh_events'].sum().to_dict()
+            severity_analysis = dict(zip(severity_df['severity'], severity_df['harsh_events']))
 
             return {
-                'avg_harsh_events_per_trip': safe_float(trip_analysis['total_harsh_events'].mean()),
-                'total_harsh_events': safe_int(df['total_harsh_events'].sum()),
-                'total_trips_analyzed': len(trip_analysis),
+                'avg_harsh_events_per_trip': safe_float(summary['harsh_events_per_trip']),
+                'total_harsh_events': safe_int(summary['total_harsh_events']),
+                'total_trips_analyzed': summary['total_trips'],
                 'event_breakdown': {
-                    'harsh_braking': safe_int(df['harsh_braking_events'].sum()),
-                    'harsh_acceleration': safe_int(df['harsh_acceleration_events'].sum()),
-                    'harsh_cornering': safe_int(df['harsh_cornering_events'].sum())
+                    'harsh_braking': safe_int(summary['total_harsh_braking']),
+                    'harsh_acceleration': safe_int(summary['total_harsh_acceleration']),
+                    'harsh_cornering': safe_int(summary['total_harsh_cornering'])
                 },
                 'severity_distribution': severity_analysis,
-                'driver_analysis': driver_analysis.round(2).to_dict('records'),
-                'worst_offenders': driver_analysis.nlargest(10, 'harsh_events_per_trip')[
-                    ['driver_name', 'total_harsh_events', 'total_trips', 'harsh_events_per_trip']
-                ].to_dict('records')
+                'driver_analysis': driver_analysis,
+                'worst_offenders': [record for _, _, record in sorted(worst_offenders, reverse=True)]
             }
         except Exception as e:
             logger.error(f"Error calculating harsh driving events KPI: {e}")
             return {'error': str(e)}
 
-    def get_rest_time_compliance_kpi(self, start_date: str, end_date: str) -> Dict:
+    def get_rest_time_compliance_kpi(self, start_date: str, end_date: str, conn=None) -> Dict:
         """Calculate non-compliance with rest time (fatigue risk)"""
         query = """
-        WITH trip_intervals AS (
+        WITH ordered_trips AS (
             SELECT
-                t1.driver_id,
-                d.name as driver_name,
-                t1.trip_id as current_trip,
-                t1.actual_arrival_time as current_arrival,
-                t2.actual_departure_time as next_departure,
-                EXTRACT(EPOCH FROM (t2.actual_departure_time - t1.actual_arrival_time))/3600 as rest_hours,
-                CASE
-                    WHEN EXTRACT(EPOCH FROM (t2.actual_departure_time - t1.actual_arrival_time))/3600 < 8 THEN 'Non-Compliant'
-                    ELSE 'Compliant'
-                END as compliance_status
-            FROM trips t1
-            JOIN trips t2 ON t1.driver_id = t2.driver_id
-                AND t2.actual_departure_time > t1.actual_arrival_time
-            JOIN drivers d ON t1.driver_id = d.driver_id
-            WHERE t1.actual_arrival_time >= %(start_date)s
-            AND t1.actual_arrival_time <= %(end_date)s
-            AND t1.status = 'Completed'
-            AND t2.status = 'Completed'
-            AND t1.actual_arrival_time IS NOT NULL
-            AND t2.actual_departure_time IS NOT NULL
-            AND NOT EXISTS (
-                SELECT 1 FROM trips t3
-                WHERE t3.driver_id = t1.driver_id
-                AND t3.actual_departure_time > t1.actual_arrival_time
-                AND t3.actual_departure_time < t2.actual_departure_time
-            )
+                t.driver_id,
+                t.trip_id,
+                t.status,
+                t.actual_arrival_time,
+                LEAD(t.actual_departure_time) OVER w as next_departure,
+                LEAD(t.status) OVER w as next_status
+            FROM trips t
+            WHERE t.actual_departure_time IS NOT NULL
+            WINDOW w AS (PARTITION BY t.driver_id ORDER BY t.actual_departure_time)
+        ),
+        trip_intervals AS (
+            SELECT
+                o.driver_id,
+                o.trip_id as current_trip,
+                o.actual_arrival_time as current_arrival,
+                o.next_departure,
+                (EXTRACT(EPOCH FROM (o.next_departure - o.actual_arrival_time))/3600)::float8 as rest_hours
+            FROM ordered_trips o
+            WHERE o.actual_arrival_time >= %(start_date)s
+            AND o.actual_arrival_time <= %(end_date)s
+            AND o.status = 'Completed'
+            AND o.next_status = 'Completed'
+            AND o.next_departure > o.actual_arrival_time
         )
         SELECT
-            driver_id,
-            driver_name,
+            d.driver_id,
+            d.name as driver_name,
             COUNT(*) as total_intervals,
-            COUNT(CASE WHEN compliance_status = 'Non-Compliant' THEN 1 END) as non_compliant_intervals,
-            COUNT(CASE WHEN compliance_status = 'Compliant' THEN 1 END) as compliant_intervals,
+            COUNT(*) FILTER (WHERE rest_hours < 8) as non_compliant_intervals,
+            COUNT(*) FILTER (WHERE rest_hours >= 8) as compliant_intervals,
             AVG(rest_hours) as avg_rest_hours,
             MIN(rest_hours) as min_rest_hours
-        FROM trip_intervals
-        GROUP BY driver_id, driver_name
-        ORDER BY non_compliant_intervals DESC
+        FROM trip_intervals i
+        JOIN drivers d ON i.driver_id = d.driver_id
+        GROUP BY d.driver_id
+        ORDER BY non_compliant_intervals DESC, d.driver_id
         """
 
         try:
-            engine = self.db.get_engine()
-            df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
+            df = self._read_sql(query, {'start_date': start_date, 'end_date': end_date}, conn)
 
             if df.empty:
                 return {'rest_time_compliance_rate': 100, 'analysis': {}}
 
-            # Calculate overall compliance rate
-            total_intervals = df['total_intervals'].sum()
-            compliant_intervals = df['compliant_intervals'].sum()
+            # Calculate overall compliance rate (COUNT columns, never null: one reduction over all three)
+            total_intervals, compliant_intervals, non_compliant_intervals = df[
+                ['total_intervals', 'compliant_intervals', 'non_compliant_intervals']
+            ].to_numpy(dtype=np.int64).sum(axis=0).tolist()
             compliance_rate = (compliant_intervals / total_intervals * 100) if total_intervals > 0 else 100
 
             # Driver-level compliance
@@ -453,13 +677,13 @@ class SafetyKPIExtractor:
 
             return {
                 'rest_time_compliance_rate': round(compliance_rate, 2),
-                'total_rest_intervals_analyzed': safe_int(total_intervals),
-                'compliant_intervals': safe_int(compliant_intervals),
-                'non_compliant_intervals': safe_int(df['non_compliant_intervals'].sum()),
+                'total_rest_intervals_analyzed': total_intervals,
+                'compliant_intervals': compliant_intervals,
+                'non_compliant_intervals': non_compliant_intervals,
                 'avg_rest_hours': safe_float(df['avg_rest_hours'].mean()),
                 'min_rest_hours_recorded': safe_float(df['min_rest_hours'].min()),
-                'driver_analysis': df[['driver_name', 'total_intervals', 'compliant_intervals',
-                                     'non_compliant_intervals', 'compliance_rate', 'avg_rest_hours']].round(2).to_dict('records'),
+                'driver_analysis': frame_records(df, ['driver_name', 'total_intervals', 'compliant_intervals',
+                                                      'non_compliant_intervals', 'compliance_rate', 'avg_rest_hours']),
                 'worst_compliance': df.nsmallest(10, 'compliance_rate')[
                     ['driver_name', 'total_intervals', 'non_compliant_intervals', 'compliance_rate']
                 ].to_dict('records'),
@@ -471,28 +695,22 @@ class SafetyKPIExtractor:
             logger.error(f"Error calculating rest time compliance KPI: {e}")
             return {'error': str(e)}
 
-    def get_high_risk_trips_kpi(self, start_date: str, end_date: str) -> Dict:
+    def get_high_risk_trips_kpi(self, start_date: str, end_date: str, conn=None) -> Dict:
         """Calculate high-risk trips based on composite score thresholds"""
-        query = """
+        scored_trips = """
         WITH trip_risk_scores AS (
             SELECT
                 t.trip_id,
                 t.driver_id,
                 d.name as driver_name,
-                d.safety_score,
-                d.fatigue_score,
-                tr.composite_score as transporter_score,
                 COUNT(te.event_id) as total_events,
-                COUNT(CASE WHEN te.type IN ('harsh_braking', 'harsh_acceleration', 'harsh_cornering') THEN 1 END) as harsh_events,
-                COUNT(CASE WHEN te.type = 'overspeeding' THEN 1 END) as overspeeding_events,
-                COUNT(CASE WHEN te.type = 'phone_usage' THEN 1 END) as phone_events,
                 -- Calculate composite risk score (lower is riskier)
                 (
                     COALESCE(d.safety_score, 50) * 0.4 +
                     COALESCE(d.fatigue_score, 50) * 0.3 +
                     COALESCE(tr.composite_score, 50) * 0.2 +
                     GREATEST(0, 100 - COUNT(te.event_id) * 5) * 0.1
-                ) as trip_risk_score
+                )::float8 as trip_risk_score
             FROM trips t
             JOIN drivers d ON t.driver_id = d.driver_id
             JOIN transporters tr ON t.transporter_id = tr.transporter_id
@@ -500,73 +718,124 @@ class SafetyKPIExtractor:
             WHERE t.actual_departure_time >= %(start_date)s
             AND t.actual_departure_time <= %(end_date)s
             AND t.status = 'Completed'
-            GROUP BY t.trip_id, t.driver_id, d.name, d.safety_score, d.fatigue_score, tr.composite_score
+            GROUP BY t.trip_id, d.driver_id, tr.transporter_id
+        ),
+        scored_trips AS (
+            SELECT
+                *,
+                CASE
+                    WHEN trip_risk_score < 40 THEN 'Very High Risk'
+                    WHEN trip_risk_score < 60 THEN 'High Risk'
+                    WHEN trip_risk_score < 75 THEN 'Medium Risk'
+                    ELSE 'Low Risk'
+                END as risk_category
+            FROM trip_risk_scores
         )
+        """
+
+        # One round trip: scored_trips is referenced by all three blocks, so PostgreSQL
+        # materializes it once instead of rescoring every trip per result set
+        query = scored_trips + """
         SELECT
-            trip_id,
+            'distribution' as row_kind,
+            ROW_NUMBER() OVER (ORDER BY COUNT(*) DESC, risk_category) as row_order,
+            NULL::int as driver_id,
+            NULL::text as driver_name,
+            risk_category,
+            COUNT(*) as trips,
+            SUM(trip_risk_score)::float8 as risk_score,
+            NULL::bigint as total_events
+        FROM scored_trips
+        GROUP BY risk_category
+        UNION ALL
+        SELECT * FROM (
+            SELECT
+                'highest_risk' as row_kind,
+                ROW_NUMBER() OVER (ORDER BY trip_risk_score ASC, trip_id) as row_order,
+                NULL::int,
+                driver_name,
+                risk_category,
+                NULL::bigint,
+                trip_risk_score,
+                total_events
+            FROM scored_trips
+            ORDER BY trip_risk_score ASC, trip_id
+            LIMIT 20
+        ) highest_risk
+        UNION ALL
+        SELECT
+            'driver' as row_kind,
+            driver_id,
             driver_id,
             driver_name,
-            safety_score,
-            fatigue_score,
-            transporter_score,
-            total_events,
-            harsh_events,
-            overspeeding_events,
-            phone_events,
-            trip_risk_score,
-            CASE
-                WHEN trip_risk_score < 40 THEN 'Very High Risk'
-                WHEN trip_risk_score < 60 THEN 'High Risk'
-                WHEN trip_risk_score < 75 THEN 'Medium Risk'
-                ELSE 'Low Risk'
-            END as risk_category
-        FROM trip_risk_scores
-        ORDER BY trip_risk_score ASC
+            NULL,
+            COUNT(*),
+            AVG(trip_risk_score),
+            SUM(total_events)::bigint
+        FROM scored_trips
+        GROUP BY driver_id, driver_name
+        ORDER BY row_kind, row_order
         """
 
         try:
-            engine = self.db.get_engine()
-            df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
-
-            if df.empty:
+            rows = self._fetch_rows(query, {'start_date': start_date, 'end_date': end_date}, conn)
+
+            distribution_rows = []
+            highest_risk_trips = []
+            driver_risk = []
+            for row in rows:
+                if row['row_kind'] == 'distribution':
+                    distribution_rows.append(row)
+                elif row['row_kind'] == 'highest_risk':
+                    highest_risk_trips.append({
+                        'driver_name': row['driver_name'],
+                        'trip_risk_score': row['risk_score'],
+                        'risk_category': row['risk_category'],
+                        'total_events': row['total_events']
+                    })
+                else:
+                    driver_risk.append({
+                        'driver_id': row['driver_id'],
+                        'driver_name': row['driver_name'],
+                        'avg_risk_score': row['risk_score'],
+                        'total_trips': row['trips'],
+                        'total_events': safe_int(row['total_events'])
+                    })
+
+            if not distribution_rows:
                 return {'high_risk_trip_percentage': 0, 'analysis': {}}
 
-            # Risk distribution
-            risk_distribution = df['risk_category'].value_counts().to_dict()
-            total_trips = len(df)
-            high_risk_trips = len(df[df['risk_category'].isin(['High Risk', 'Very High Risk'])])
+            # Risk distribution and overall totals from the per-category rollup
+            risk_distribution = {row['risk_category']: row['trips'] for row in distribution_rows}
+            total_trips = sum(risk_distribution.values())
+            high_risk_trips = risk_distribution.get('High Risk', 0) + risk_distribution.get('Very High Risk', 0)
             high_risk_percentage = (high_risk_trips / total_trips * 100) if total_trips > 0 else 0
+            avg_trip_risk_score = sum(row['risk_score'] for row in distribution_rows) / total_trips
 
             # Driver risk analysis
-            driver_risk = df.groupby(['driver_id', 'driver_name']).agg({
-                'trip_risk_score': 'mean',
-                'trip_id': 'count',
-                'total_events': 'sum'
-            }).reset_index()
-            driver_risk.columns = ['driver_id', 'driver_name', 'avg_risk_score', 'total_trips', 'total_events']
+            driver_columns = ['driver_id', 'driver_name', 'avg_risk_score', 'total_trips', 'total_events']
 
             # High-risk drivers (avg score < 60)
-            high_risk_drivers = driver_risk[driver_risk['avg_risk_score'] < 60]
+            high_risk_drivers = [row for row in driver_risk if row['avg_risk_score'] < 60]
 
             return {
                 'high_risk_trip_percentage': round(high_risk_percentage, 2),
                 'total_trips_analyzed': total_trips,
                 'high_risk_trips': high_risk_trips,
-                'avg_trip_risk_score': safe_float(df['trip_risk_score'].mean()),
+                'avg_trip_risk_score': safe_float(avg_trip_risk_score),
                 'risk_distribution': risk_distribution,
-                'highest_risk_trips': df.nsmallest(20, 'trip_risk_score')[
-                    ['driver_name', 'trip_risk_score', 'risk_category', 'total_events']
-                ].to_dict('records'),
-                'driver_risk_analysis': driver_risk.round(2).to_dict('records'),
-                'high_risk_drivers': high_risk_drivers[
-                    ['driver_name', 'avg_risk_score', 'total_trips']
-                ].to_dict('records')
+                'highest_risk_trips': highest_risk_trips,
+                'driver_risk_analysis': [round_record(row, driver_columns) for row in driver_risk],
+                'high_risk_drivers': [
+                    round_record(row, ['driver_name', 'avg_risk_score', 'total_trips'], decimals=None)
+                    for row in high_risk_drivers
+                ]
             }
         except Exception as e:
             logger.error(f"Error calculating high-risk trips KPI: {e}")
             return {'error': str(e)}
 
-    def get_incident_heatmaps_kpi(self, start_date: str, end_date: str) -> Dict:
+    def get_incident_heatmaps_kpi(self, start_date: str, end_date: str, conn=None) -> Dict:
         """Calculate incident heatmaps (location-based trends)"""
         query = """
         SELECT
@@ -575,9 +844,9 @@ class SafetyKPIExtractor:
             ir.type as incident_type,
             ir.severity,
             COUNT(*) as incident_count,
-            AVG(ir.latitude) as avg_lat,
-            AVG(ir.longitude) as avg_lng,
-            STRING_AGG(DISTINCT d.name, ', ') as involved_drivers
+            AVG(ir.latitude)::float8 as avg_lat,
+            AVG(ir.longitude)::float8 as avg_lng,
+            array_agg(DISTINCT d.name) as involved_drivers
         FROM incident_reports ir
         JOIN drivers d ON ir.driver_id = d.driver_id
         WHERE ir.timestamp >= %(start_date)s
@@ -585,17 +854,54 @@ class SafetyKPIExtractor:
         AND ir.latitude IS NOT NULL
         AND ir.longitude IS NOT NULL
         GROUP BY ir.latitude, ir.longitude, ir.type, ir.severity
-        ORDER BY incident_count DESC
+        ORDER BY incident_count DESC, ir.latitude, ir.longitude, ir.type, ir.severity
         """
 
-        # Also get trip events for additional location data
+        # Geographic clustering - geohash cells (~1.2km x 0.6km) when PostGIS is available,
+        # otherwise coordinates rounded to 2 decimals
+        if self.has_postgis(conn):
+            cell_expr = "ST_GeoHash(ST_SetSRID(ST_MakePoint(longitude, latitude), 4326), 6)"
+        else:
+            cell_expr = "ROUND(latitude::numeric, 2) || ',' || ROUND(longitude::numeric, 2)"
+
+        clusters_query = f"""
+        WITH hotspots AS (
+            SELECT
+                ir.latitude,
+                ir.longitude,
+                ir.type as incident_type,
+                ir.severity,
+                COUNT(*) as incident_count
+            FROM incident_reports ir
+            JOIN drivers d ON ir.driver_id = d.driver_id
+            WHERE ir.timestamp >= %(start_date)s
+            AND ir.timestamp <= %(end_date)s
+            AND ir.latitude IS NOT NULL
+            AND ir.longitude IS NOT NULL
+            GROUP BY ir.latitude, ir.longitude, ir.type, ir.severity
+        )
+        SELECT
+            {cell_expr} as cell,
+            ROUND(AVG(latitude)::numeric, 2)::float8 as lat_rounded,
+            ROUND(AVG(longitude)::numeric, 2)::float8 as lng_rounded,
+            SUM(incident_count)::int as incident_count,
+            array_agg(incident_type) as incident_type,
+            array_agg(severity) as severity
+        FROM hotspots
+        GROUP BY cell
+        ORDER BY lat_rounded, lng_rounded
+        """
+
+        # Also get trip events for additional location data; only the top 20 locations are
+        # returned, with the overall event total carried on each row
         events_query = """
         SELECT
             te.latitude,
             te.longitude,
             te.type as event_type,
             te.severity,
-            COUNT(*) as event_count
+            COUNT(*) as event_count,
+            SUM(COUNT(*)) OVER () as total_event_count
         FROM trip_events te
         JOIN trips t ON te.trip_id = t.trip_id
         WHERE te.event_time >= %(start_date)s
@@ -604,13 +910,15 @@ class SafetyKPIExtractor:
         AND te.longitude IS NOT NULL
         AND te.type IN ('harsh_braking', 'harsh_acceleration', 'harsh_cornering', 'overspeeding')
         GROUP BY te.latitude, te.longitude, te.type, te.severity
-        ORDER BY event_count DESC
+        ORDER BY event_count DESC, te.latitude, te.longitude, te.type, te.severity
+        LIMIT 20
         """
 
         try:
-            engine = self.db.get_engine()
-            incidents_df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
-            events_df = pd.read_sql_query(events_query, engine, params={'start_date': start_date, 'end_date': end_date})
+            params = {'start_date': start_date, 'end_date': end_date}
+            incidents_df = self._read_sql(query, params, conn)
+            event_hotspots = self._fetch_rows(events_query, params, conn)
+            clusters_df = self._read_sql(clusters_query, params, conn)
 
             # Incident hotspots
             incident_hotspots = []
@@ -618,27 +926,18 @@ class SafetyKPIExtractor:
                 incident_hotspots = incidents_df.head(20).to_dict('records')
 
             # Event hotspots
-            event_hotspots = []
-            if not events_df.empty:
-                event_hotspots = events_df.head(20).to_dict('records')
+            total_events = event_hotspots[0]['total_event_count'] if event_hotspots else 0
+            for row in event_hotspots:
+                del row['total_event_count']
 
-            # Geographic clustering (simplified - group by rounded coordinates)
+            # Geographic clusters
             geographic_clusters = {}
-            if not incidents_df.empty:
-                incidents_df['lat_rounded'] = incidents_df['latitude'].round(2)
-                incidents_df['lng_rounded'] = incidents_df['longitude'].round(2)
-
-                clusters = incidents_df.groupby(['lat_rounded', 'lng_rounded']).agg({
-                    'incident_count': 'sum',
-                    'incident_type': lambda x: list(x),
-                    'severity': lambda x: list(x)
-                }).reset_index()
-
-                geographic_clusters = clusters.to_dict('records')
+            if not clusters_df.empty:
+                geographic_clusters = clusters_df.to_dict('records')
 
             return {
                 'total_incidents_with_location': safe_int(incidents_df['incident_count'].sum()) if not incidents_df.empty else 0,
-                'total_events_with_location': safe_int(events_df['event_count'].sum()) if not events_df.empty else 0,
+                'total_events_with_location': safe_int(total_events),
                 'incident_hotspots': incident_hotspots,
                 'event_hotspots': event_hotspots,
                 'geographic_clusters': geographic_clusters,
@@ -649,7 +948,7 @@ class SafetyKPIExtractor:
             logger.error(f"Error calculating incident heatmaps KPI: {e}")
             return {'error': str(e)}
 
-    def get_repeat_offenders_kpi(self, start_date: str, end_date: str) -> Dict:
+    def get_repeat_offenders_kpi(self, start_date: str, end_date: str, conn=None) -> Dict:
         """Calculate repeat offenders (driver-level behavior history)"""
         query = """
         WITH driver_violations AS (
@@ -672,11 +971,30 @@ class SafetyKPIExtractor:
             LEFT JOIN incident_reports ir ON d.driver_id = ir.driver_id
                 AND ir.timestamp >= %(start_date)s
                 AND ir.timestamp <= %(end_date)s
-            GROUP BY d.driver_id, d.name
+            GROUP BY d.driver_id
             HAVING COUNT(DISTINCT t.trip_id) > 0
+        ),
+        ranked AS (
+            SELECT
+                *,
+                ROW_NUMBER() OVER (ORDER BY violations_per_trip DESC, total_violations DESC, driver_id) as offender_rank
+            FROM (
+                SELECT
+                    *,
+                    (total_violations::float / total_trips) as violations_per_trip,
+                    CASE
+                        WHEN total_violations >= 20 AND (total_violations::float / total_trips) >= 2 THEN 'High Risk Repeat Offender'
+                        WHEN total_violations >= 10 AND (total_violations::float / total_trips) >= 1 THEN 'Moderate Risk Repeat Offender'
+                        WHEN total_violations >= 5 THEN 'Low Risk Repeat Offender'
+                        ELSE 'Compliant Driver'
+                    END as offender_category
+                FROM driver_violations
+            ) classified
         )
+        -- Repeat offenders plus the 15 worst drivers overall
         SELECT
-            driver_id,
+            'driver' as row_kind,
+            offender_rank,
             driver_name,
             overspeeding_violations,
             phone_violations,
@@ -684,70 +1002,99 @@ class SafetyKPIExtractor:
             incident_reports,
             total_trips,
             total_violations,
-            (total_violations::float / total_trips) as violations_per_trip,
-            CASE
-                WHEN total_violations >= 20 AND (total_violations::float / total_trips) >= 2 THEN 'High Risk Repeat Offender'
-                WHEN total_violations >= 10 AND (total_violations::float / total_trips) >= 1 THEN 'Moderate Risk Repeat Offender'
-                WHEN total_violations >= 5 THEN 'Low Risk Repeat Offender'
-                ELSE 'Compliant Driver'
-            END as offender_category
-        FROM driver_violations
-        ORDER BY (total_violations::float / total_trips) DESC, total_violations DESC
+            violations_per_trip,
+            offender_category,
+            1 as drivers
+        FROM ranked
+        WHERE offender_rank <= 15
+        OR offender_category <> 'Compliant Driver'
+        UNION ALL
+        -- Driver count per category, plus one summary row over all drivers
+        SELECT
+            CASE WHEN GROUPING(offender_category) = 1 THEN 'summary' ELSE 'distribution' END,
+            NULL,
+            NULL,
+            SUM(overspeeding_violations)::bigint,
+            SUM(phone_violations)::bigint,
+            SUM(harsh_driving_violations)::bigint,
+            SUM(incident_reports)::bigint,
+            SUM(total_trips)::bigint,
+            SUM(total_violations)::bigint,
+            AVG(violations_per_trip),
+            offender_category,
+            COUNT(*)
+        FROM ranked
+        GROUP BY GROUPING SETS ((offender_category), ())
+        ORDER BY row_kind, offender_rank, drivers DESC
         """
 
         try:
-            engine = self.db.get_engine()
-            df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
-
-            if df.empty:
+            rows = self._fetch_rows(query, {'start_date': start_date, 'end_date': end_date}, conn)
+
+            summary = None
+            offender_distribution = {}
+            driver_rows = []
+            for row in rows:
+                if row['row_kind'] == 'summary':
+                    summary = row
+                elif row['row_kind'] == 'distribution':
+                    offender_distribution[row['offender_category']] = row['drivers']
+                else:
+                    # Round once here; both driver lists below are plain projections of these rows
+                    row['violations_per_trip'] = round(row['violations_per_trip'], 2)
+                    driver_rows.append(row)
+
+            if summary is None or summary['drivers'] == 0:
                 return {'repeat_offenders_count': 0, 'analysis': {}}
 
-            # Offender distribution
-            offender_distribution = df['offender_category'].value_counts().to_dict()
-
-            # Repeat offenders (excluding compliant drivers)
-            repeat_offenders = df[df['offender_category'] != 'Compliant Driver']
+            total_drivers = summary['drivers']
+            compliant_drivers = offender_distribution.get('Compliant Driver', 0)
+            repeat_offenders_count = total_drivers - compliant_drivers
 
             # Top violation types
             violation_totals = {
-                'overspeeding': safe_int(df['overspeeding_violations'].sum()),
-                'phone_usage': safe_int(df['phone_violations'].sum()),
-                'harsh_driving': safe_int(df['harsh_driving_violations'].sum()),
-                'incidents': safe_int(df['incident_reports'].sum())
+                'overspeeding': safe_int(summary['overspeeding_violations']),
+                'phone_usage': safe_int(summary['phone_violations']),
+                'harsh_driving': safe_int(summary['harsh_driving_violations']),
+                'incidents': safe_int(summary['incident_reports'])
             }
 
             return {
-                'repeat_offenders_count': len(repeat_offenders),
-                'total_drivers_analyzed': len(df),
-                'repeat_offender_percentage': round((len(repeat_offenders) / len(df) * 100), 2) if len(df) > 0 else 0,
+                'repeat_offenders_count': repeat_offenders_count,
+                'total_drivers_analyzed': total_drivers,
+                'repeat_offender_percentage': round((repeat_offenders_count / total_drivers * 100), 2),
                 'offender_distribution': offender_distribution,
                 'violation_totals': violation_totals,
-                'avg_violations_per_trip': safe_float(df['violations_per_trip'].mean()),
-                'repeat_offenders_list': repeat_offenders[
-                    ['driver_name', 'total_violations', 'total_trips', 'violations_per_trip', 'offender_category']
-                ].round(2).to_dict('records'),
-                'worst_offenders': df.head(15)[
-                    ['driver_name', 'overspeeding_violations', 'phone_violations', 'harsh_driving_violations',
-                     'incident_reports', 'violations_per_trip']
-                ].round(2).to_dict('records'),
-                'compliant_drivers': len(df[df['offender_category'] == 'Compliant Driver'])
+                'avg_violations_per_trip': safe_float(summary['violations_per_trip']),
+                'repeat_offenders_list': [
+                    round_record(row, ['driver_name', 'total_violations', 'total_trips', 'violations_per_trip',
+                                       'offender_category'], None)
+                    for row in driver_rows if row['offender_category'] != 'Compliant Driver'
+                ],
+                # Driver rows arrive in offender_rank order, so the 15 worst lead the list
+                'worst_offenders': [
+                    round_record(row, ['driver_name', 'overspeeding_violations', 'phone_violations',
+                                       'harsh_driving_violations', 'incident_reports', 'violations_per_trip'], None)
+                    for row in driver_rows[:15]
+                ],
+                'compliant_drivers': compliant_drivers
             }
         except Exception as e:
             logger.error(f"Error calculating repeat offenders KPI: {e}")
             return {'error': str(e)}
 
-    def get_checklist_compliance_kpi(self, start_date: str, end_date: str) -> Dict:
+    def get_checklist_compliance_kpi(self, start_date: str, end_date: str, conn=None) -> Dict:
         """Calculate checklist compliance rate (e.g., daily inspection, onboarding)"""
         query = """
         SELECT
-            c.driver_id,
+            d.driver_id,
             d.name as driver_name,
             COUNT(*) as total_checklists,
             COUNT(CASE WHEN c.submitted = true THEN 1 END) as submitted_checklists,
             COUNT(CASE WHEN c.compliant = true THEN 1 END) as compliant_checklists,
             COUNT(CASE WHEN c.submitted = true AND c.compliant = true THEN 1 END) as fully_compliant,
-            AVG(CASE WHEN c.submitted THEN 1 ELSE 0 END) * 100 as submission_rate,
-            AVG(CASE WHEN c.compliant THEN 1 ELSE 0 END) * 100 as compliance_rate,
+            (AVG(CASE WHEN c.submitted THEN 1 ELSE 0 END) * 100)::float8 as submission_rate,
+            (AVG(CASE WHEN c.compliant THEN 1 ELSE 0 END) * 100)::float8 as compliance_rate,
             COUNT(DISTINCT t.trip_id) as total_trips
         FROM checklists c
         JOIN drivers d ON c.driver_id = d.driver_id
@@ -756,45 +1103,46 @@ class SafetyKPIExtractor:
             AND t.actual_departure_time <= %(end_date)s
         WHERE c.submission_time >= %(start_date)s
         AND c.submission_time <= %(end_date)s
-        GROUP BY c.driver_id, d.name
-        ORDER BY compliance_rate DESC
+        GROUP BY d.driver_id
+        ORDER BY compliance_rate DESC, d.driver_id
         """
 
         try:
-            engine = self.db.get_engine()
-            df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
+            df = self._read_sql_arrow(query, {'start_date': start_date, 'end_date': end_date}, conn)
 
             if df.empty:
                 return {'overall_compliance_rate': 0, 'analysis': {}}
 
-            # Overall metrics
-            total_checklists = df['total_checklists'].sum()
-            total_compliant = df['compliant_checklists'].sum()
-            total_submitted = df['submitted_checklists'].sum()
+            # Overall metrics (COUNT columns, never null: one reduction over all three)
+            total_checklists, total_compliant, total_submitted = df[
+                ['total_checklists', 'compliant_checklists', 'submitted_checklists']
+            ].to_numpy(dtype=np.int64).sum(axis=0).tolist()
 
             overall_compliance_rate = (total_compliant / total_checklists * 100) if total_checklists > 0 else 0
             overall_submission_rate = (total_submitted / total_checklists * 100) if total_checklists > 0 else 0
 
             # Driver performance categories
-            df['performance_category'] = df['compliance_rate'].apply(
-                lambda x: 'Excellent' if x >= 95 else
-                         'Good' if x >= 85 else
-                         'Average' if x >= 70 else
-                         'Poor'
+            # Lower bounds are inclusive (95 is Excellent); a missing rate counts as Poor
+            df['performance_category'] = pd.cut(
+                df['compliance_rate'].fillna(-np.inf),
+                bins=[-np.inf, 70, 85, 95, np.inf],
+                labels=['Poor', 'Average', 'Good', 'Excellent'],
+                right=False
             )
 
-            performance_distribution = df['performance_category'].value_counts().to_dict()
+            performance_distribution = category_counts(df['performance_category'])
 
             return {
                 'overall_compliance_rate': round(overall_compliance_rate, 2),
                 'overall_submission_rate': round(overall_submission_rate, 2),
-                'total_checklists': safe_int(total_checklists),
+                'total_checklists': total_checklists,
                 'total_drivers': len(df),
                 'performance_distribution': performance_distribution,
-                'driver_compliance': df[['driver_name', 'total_checklists', 'submitted_checklists',
-                                       'compliant_checklists', 'submission_rate', 'compliance_rate',
-                                       'performance_category']].round(2).to_dict('records'),
-                'top_performers': df.nlargest(10, 'compliance_rate')[
+                'driver_compliance': frame_records(df, ['driver_name', 'total_checklists', 'submitted_checklists',
+                                                        'compliant_checklists', 'submission_rate', 'compliance_rate',
+                                                        'performance_category']),
+                # Rows arrive sorted by compliance_rate DESC
+                'top_performers': df.head(10)[
                     ['driver_name', 'compliance_rate', 'total_checklists']
                 ].to_dict('records'),
                 'poor_performers': df[df['compliance_rate'] < 70][
@@ -805,84 +1153,150 @@ class SafetyKPIExtractor:
             logger.error(f"Error calculating checklist compliance KPI: {e}")
             return {'error': str(e)}
 
-    def get_accident_near_miss_flags_kpi(self, start_date: str, end_date: str) -> Dict:
+    def get_accident_near_miss_flags_kpi(self, start_date: str, end_date: str, conn=None) -> Dict:
         """Calculate accident/near-miss flags (manual reporting or system detection)"""
-        query = """
+        # Per-driver incident history plus type/severity distributions, aggregated server-side
+        summary_query = """
+        WITH incidents AS (
+            SELECT ir.driver_id, ir.type as incident_type, ir.severity, ir.timestamp
+            FROM incident_reports ir
+            JOIN drivers d ON ir.driver_id = d.driver_id
+            WHERE ir.timestamp >= %(start_date)s
+            AND ir.timestamp <= %(end_date)s
+        )
         SELECT
-            ir.incident_id,
-            ir.driver_id,
+            'driver' as row_kind,
+            i.driver_id,
             d.name as driver_name,
-            ir.type as incident_type,
-            ir.severity,
-            ir.timestamp,
-            ir.latitude,
-            ir.longitude,
-            ir.description,
-            t.trip_id,
-            v.plate_number,
-            tr.name as transporter_name
-        FROM incident_reports ir
-        JOIN drivers d ON ir.driver_id = d.driver_id
-        LEFT JOIN trips t ON ir.trip_id = t.trip_id
-        LEFT JOIN vehicles v ON t.vehicle_id = v.vehicle_id
-        LEFT JOIN transporters tr ON t.transporter_id = tr.transporter_id
-        WHERE ir.timestamp >= %(start_date)s
-        AND ir.timestamp <= %(end_date)s
-        ORDER BY ir.timestamp DESC
+            NULL as label,
+            COUNT(*) as incident_count,
+            COUNT(*) FILTER (WHERE i.timestamp >= %(recent_cutoff)s) as recent_count,
+            array_agg(i.severity ORDER BY i.timestamp DESC) as severities,
+            array_agg(i.incident_type ORDER BY i.timestamp DESC) as incident_types
+        FROM incidents i
+        JOIN drivers d ON i.driver_id = d.driver_id
+        GROUP BY i.driver_id, d.name
+        UNION ALL
+        SELECT
+            CASE WHEN GROUPING(incident_type) = 0 THEN 'incident_type' ELSE 'severity' END,
+            NULL,
+            NULL,
+            COALESCE(incident_type, severity),
+            COUNT(*),
+            NULL,
+            NULL,
+            NULL
+        FROM incidents
+        GROUP BY GROUPING SETS ((incident_type), (severity))
+        ORDER BY row_kind, driver_id, incident_count DESC
+        """
+
+        # Only the newest INCIDENT_DETAILS_LIMIT incidents and those since the recent cutoff; the
+        # detail-only columns (description, vehicle, transporter) are sent for the capped rows alone
+        details_query = """
+        SELECT
+            driver_name,
+            incident_type,
+            severity,
+            timestamp,
+            CASE WHEN incident_rank <= %(details_limit)s THEN description END as description,
+            CASE WHEN incident_rank <= %(details_limit)s THEN plate_number END as plate_number,
+            CASE WHEN incident_rank <= %(details_limit)s THEN transporter_name END as transporter_name,
+            is_recent,
+            incident_rank
+        FROM (
+            SELECT
+                d.name as driver_name,
+                ir.type as incident_type,
+                ir.severity,
+                ir.timestamp,
+                ir.description,
+                v.plate_number,
+                tr.name as transporter_name,
+                ir.timestamp >= %(recent_cutoff)s as is_recent,
+                ROW_NUMBER() OVER (ORDER BY ir.timestamp DESC, ir.incident_id) as incident_rank
+            FROM incident_reports ir
+            JOIN drivers d ON ir.driver_id = d.driver_id
+            LEFT JOIN trips t ON ir.trip_id = t.trip_id
+            LEFT JOIN vehicles v ON t.vehicle_id = v.vehicle_id
+            LEFT JOIN transporters tr ON t.transporter_id = tr.transporter_id
+            WHERE ir.timestamp >= %(start_date)s
+            AND ir.timestamp <= %(end_date)s
+        ) ranked
+        WHERE incident_rank <= %(details_limit)s
+        OR is_recent
+        ORDER BY incident_rank
         """
 
         try:
-            engine = self.db.get_engine()
-            df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
+            detail_columns = ['driver_name', 'incident_type', 'severity', 'timestamp',
+                              'plate_number', 'transporter_name', 'description']
+            recent_columns = ['driver_name', 'incident_type', 'severity', 'timestamp']
+            # Midnight 30 days ago; adapted by psycopg2 as a timestamp literal, compared in the database
+            recent_cutoff = pd.Timestamp.now().normalize() - pd.Timedelta(days=30)
+            params = {
+                'start_date': start_date,
+                'end_date': end_date,
+                'recent_cutoff': recent_cutoff,
+                'details_limit': self.INCIDENT_DETAILS_LIMIT
+            }
 
-            if df.empty:
+            driver_summary = []
+            incident_type_distribution = {}
+            severity_distribution = {}
+            recent_incident_count = 0
+            for row in self._fetch_rows(summary_query, params, conn):
+                if row['row_kind'] == 'driver':
+                    recent_incident_count += row['recent_count']
+                    driver_summary.append(round_record(
+                        row, ['driver_id', 'driver_name', 'incident_count', 'severities', 'incident_types'], None
+                    ))
+                elif row['label'] is not None:
+                    distribution = incident_type_distribution if row['row_kind'] == 'incident_type' else severity_distribution
+                    distribution[row['label']] = row['incident_count']
+
+            total_incidents = sum(driver['incident_count'] for driver in driver_summary)
+            if total_incidents == 0:
                 return {'total_incidents': 0, 'analysis': {}}
 
-            # Incident analysis
-            incident_type_distribution = df['incident_type'].value_counts().to_dict()
-            severity_distribution = df['severity'].value_counts().to_dict()
-
-            # Driver involvement
-            driver_incidents = df.groupby(['driver_id', 'driver_name']).agg({
-                'incident_id': 'count',
-                'severity': lambda x: list(x),
-                'incident_type': lambda x: list(x)
-            }).reset_index()
-            driver_incidents.columns = ['driver_id', 'driver_name', 'incident_count', 'severities', 'incident_types']
-
-            # High-risk drivers (multiple incidents)
-            high_risk_drivers = driver_incidents[driver_incidents['incident_count'] >= 2]
-
-            # Recent incidents (last 30 days)
-            recent_cutoff = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-            recent_incidents = df[df['timestamp'] >= recent_cutoff] if not df.empty else pd.DataFrame()
+            incident_details = []
+            recent_incidents = []
+            for row in self._stream_rows(details_query, params, conn):
+                row['timestamp'] = str(row['timestamp'])
+                if row['incident_rank'] <= self.INCIDENT_DETAILS_LIMIT:
+                    incident_details.append(round_record(row, detail_columns, None))
+                if row['is_recent']:
+                    recent_incidents.append(round_record(row, recent_columns, None))
 
             return {
-                'total_incidents': len(df),
-                'total_drivers_involved': df['driver_id'].nunique(),
+                'total_incidents': total_incidents,
+                'total_drivers_involved': len(driver_summary),
                 'incident_type_distribution': incident_type_distribution,
                 'severity_distribution': severity_distribution,
-                'recent_incidents_30_days': len(recent_incidents),
-                'incident_details': df[['driver_name', 'incident_type', 'severity', 'timestamp',
-                                      'plate_number', 'transporter_name', 'description']].to_dict('records'),
-                'driver_incident_summary': driver_incidents.to_dict('records'),
-                'high_risk_drivers': high_risk_drivers[['driver_name', 'incident_count']].to_dict('records'),
-                'recent_incidents': recent_incidents[['driver_name', 'incident_type', 'severity', 'timestamp']].to_dict('records') if not recent_incidents.empty else []
+                'recent_incidents_30_days': recent_incident_count,
+                'incident_details': incident_details,
+                'driver_incident_summary': driver_summary,
+                # High-risk drivers (multiple incidents)
+                'high_risk_drivers': [
+                    {'driver_name': driver['driver_name'], 'incident_count': driver['incident_count']}
+                    for driver in driver_summary if driver['incident_count'] >= 2
+                ],
+                'recent_incidents': recent_incidents
             }
         except Exception as e:
             logger.error(f"Error calculating accident/near-miss flags KPI: {e}")
             return {'error': str(e)}
 
-    def get_fatigue_scoring_kpi(self, start_date: str, end_date: str) -> Dict:
+    def get_fatigue_scoring_kpi(self, start_date: str, end_date: str, conn=None) -> Dict:
         """Calculate fatigue scoring for drivers"""
         query = """
         SELECT
             d.driver_id,
             d.name as driver_name,
-            d.fatigue_score,
+            d.fatigue_score::float8 as fatigue_score,
             COUNT(t.trip_id) as total_trips,
-            AVG(EXTRACT(EPOCH FROM (t.actual_arrival_time - t.actual_departure_time))/3600) as avg_trip_duration_hours,
-            SUM(EXTRACT(EPOCH FROM (t.actual_arrival_time - t.actual_departure_time))/3600) as total_driving_hours,
+            AVG(EXTRACT(EPOCH FROM (t.actual_arrival_time - t.actual_departure_time))/3600)::float8 as avg_trip_duration_hours,
+            SUM(EXTRACT(EPOCH FROM (t.actual_arrival_time - t.actual_departure_time))/3600)::float8 as total_driving_hours,
             COUNT(DISTINCT DATE(t.actual_departure_time)) as active_days
         FROM drivers d
         LEFT JOIN trips t ON d.driver_id = t.driver_id
@@ -892,55 +1306,56 @@ class SafetyKPIExtractor:
             AND t.actual_departure_time IS NOT NULL
             AND t.actual_arrival_time IS NOT NULL
         WHERE d.fatigue_score IS NOT NULL
-        GROUP BY d.driver_id, d.name, d.fatigue_score
+        GROUP BY d.driver_id
         HAVING COUNT(t.trip_id) > 0
-        ORDER BY d.fatigue_score ASC
+        ORDER BY d.fatigue_score ASC, d.driver_id
         """
 
         try:
-            engine = self.db.get_engine()
-            df = pd.read_sql_query(query, engine, params={'start_date': start_date, 'end_date': end_date})
-
-            if df.empty:
-                return {'avg_fatigue_score': 0, 'analysis': {}}
-
-            # Convert numeric columns
-            df['fatigue_score'] = pd.to_numeric(df['fatigue_score'], errors='coerce')
-            df = df.dropna(subset=['fatigue_score'])
+            df = self._read_sql_arrow(
+                query, {'start_date': start_date, 'end_date': end_date}, conn,
+                dtype={'fatigue_score': 'float64', 'total_trips': 'int64', 'active_days': 'int64'}
+            )
 
             if df.empty:
                 return {'avg_fatigue_score': 0, 'analysis': {}}
 
-            # Calculate additional metrics
-            df['avg_daily_hours'] = df['total_driving_hours'] / df['active_days']
+            # Work on the raw arrays once; fatigue_score is never null (filtered in SQL)
+            fatigue_scores = df['fatigue_score'].to_numpy(dtype=np.float64)
+            avg_daily_hours = df['total_driving_hours'].to_numpy(dtype=np.float64) / df['active_days'].to_numpy(dtype=np.float64)
+            df['avg_daily_hours'] = avg_daily_hours
 
             # Fatigue risk categories
-            df['fatigue_risk_category'] = df['fatigue_score'].apply(
-                lambda x: 'High Risk' if x <= 30 else
-                         'Medium Risk' if x <= 60 else
-                         'Low Risk'
+            # Upper bounds are inclusive (30 is High Risk); a missing score counts as Low Risk
+            df['fatigue_risk_category'] = pd.cut(
+                df['fatigue_score'].fillna(np.inf),
+                bins=[-np.inf, 30, 60, np.inf],
+                labels=['High Risk', 'Medium Risk', 'Low Risk']
             )
 
-            fatigue_distribution = df['fatigue_risk_category'].value_counts().to_dict()
+            fatigue_distribution = category_counts(df['fatigue_risk_category'])
 
             # High fatigue drivers
-            high_fatigue_drivers = df[df['fatigue_score'] <= 40]
+            high_fatigue_drivers = df[fatigue_scores <= 40]
 
             return {
-                'avg_fatigue_score': safe_float(df['fatigue_score'].mean()),
-                'lowest_fatigue_score': safe_float(df['fatigue_score'].min()),
-                'highest_fatigue_score': safe_float(df['fatigue_score'].max()),
+                'avg_fatigue_score': safe_float(fatigue_scores.mean()),
+                'lowest_fatigue_score': safe_float(fatigue_scores.min()),
+                'highest_fatigue_score': safe_float(fatigue_scores.max()),
                 'total_drivers_analyzed': len(df),
                 'fatigue_risk_distribution': fatigue_distribution,
-                'avg_daily_driving_hours': safe_float(df['avg_daily_hours'].mean()),
-                'driver_fatigue_analysis': df[['driver_name', 'fatigue_score', 'total_trips', 'total_driving_hours',
-                                             'avg_daily_hours', 'fatigue_risk_category']].round(2).to_dict('records'),
-                'high_fatigue_risk_drivers': high_fatigue_drivers[
+                'avg_daily_driving_hours': safe_float(np.nanmean(avg_daily_hours)),
+                'driver_fatigue_analysis': frame_records(df, ['driver_name', 'fatigue_score', 'total_trips',
+                                                              'total_driving_hours', 'avg_daily_hours',
+                                                              'fatigue_risk_category']),
+                'high_fatigue_risk_drivers': frame_records(
+                    high_fatigue_drivers,
                     ['driver_name', 'fatigue_score', 'avg_daily_hours', 'total_driving_hours']
-                ].round(2).to_dict('records'),
-                'overworked_drivers': df[df['avg_daily_hours'] > 10][
+                ),
+                'overworked_drivers': frame_records(
+                    df[avg_daily_hours > 10],
                     ['driver_name', 'avg_daily_hours', 'fatigue_score', 'active_days']
-                ].round(2).to_dict('records')
+                )
             }
         except Exception as e:
             logger.error(f"Error calculating fatigue scoring KPI: {e}")
@@ -952,13 +1367,16 @@ class SafetyKPIExtractor:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"safety_kpis_{timestamp}.json"
 
-        filepath = os.path.join(os.path.dirname(__file__), '..', filename)
+        filepath = _OUT_DIR / filename
 
         try:
-            with open(filepath, 'w') as f:
-                json.dump(kpis, f, indent=2, default=str)
+            filepath.write_bytes(orjson.dumps(
+                kpis,
+                default=str,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            ))
             logger.info(f"Safety KPIs exported to {filepath}")
-            return filepath
+            return str(filepath)
         except Exception as e:
             logger.error(f"Error exporting Safety KPIs to JSON: {e}")
             return None
@@ -6,7 +6,9 @@ Uses the existing KPI extractors to pull real data from database and save as JSO
 
 import os
 import sys
-import json
+import importlib
+import orjson
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
 from dotenv import load_dotenv
@@ -18,22 +20,23 @@ load_dotenv(dotenv_path=env_path)
 # Add current directory to path
 sys.path.append(os.path.dirname(__file__))
 
+# (label, output file prefix, module, extractor class), in output order
+KPI_EXTRACTORS = [
+    ('Operations', 'operations_kpis', 'data_extractor.operations_kpi_extractor', 'OperationsKPIExtractor'),
+    ('Safety', 'safety_kpis', 'data_extractor.safety_kpi_extractor', 'SafetyKPIExtractor'),
+    ('Combined', 'combined_kpis', 'data_extractor.combined_kpi_extractor', 'CombinedKPIExtractor'),
+]
+
+def run_extractor(module_name: str, class_name: str, start_date: str, end_date: str):
+    """Run one KPI extractor in a worker process; the extractor opens its own connection pool there"""
+    extractor_class = getattr(importlib.import_module(module_name), class_name)
+    return extractor_class().extract_all_kpis(start_date, end_date)
+
 def generate_real_kpi_data():
     """Generate real KPI data using existing extractors"""
     print("🔄 Generating Real KPI Data from Database...")
     
     try:
-        # Import the extractors
-        from data_extractor.operations_kpi_extractor import OperationsKPIExtractor
-        from data_extractor.safety_kpi_extractor import SafetyKPIExtractor
-        from data_extractor.combined_kpi_extractor import CombinedKPIExtractor
-        
-        # Initialize extractors
-        print("   - Initializing KPI extractors...")
-        operations_extractor = OperationsKPIExtractor()
-        safety_extractor = SafetyKPIExtractor()
-        combined_extractor = CombinedKPIExtractor()
-        
         # Set date range (last 1 year by default)
         end_date = datetime.now().strftime('%Y-%m-%d')
         start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
@@ -47,47 +50,31 @@ def generate_real_kpi_data():
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         files_created = []
         
-        # Extract Operations KPIs
-        print("   - Extracting Operations KPIs...")
-        try:
-            operations_data = operations_extractor.extract_all_kpis(start_date, end_date)
-            
-            ops_file = kpi_data_dir / f"operations_kpis_{timestamp}.json"
-            with open(ops_file, 'w', encoding='utf-8') as f:
-                json.dump(operations_data, f, indent=2, default=str)
-            files_created.append(str(ops_file))
-            print("     ✅ Operations KPIs extracted successfully")
-            
-        except Exception as e:
-            print(f"     ❌ Error extracting Operations KPIs: {e}")
-        
-        # Extract Safety KPIs
-        print("   - Extracting Safety KPIs...")
-        try:
-            safety_data = safety_extractor.extract_all_kpis(start_date, end_date)
-            
-            safety_file = kpi_data_dir / f"safety_kpis_{timestamp}.json"
-            with open(safety_file, 'w', encoding='utf-8') as f:
-                json.dump(safety_data, f, indent=2, default=str)
-            files_created.append(str(safety_file))
-            print("     ✅ Safety KPIs extracted successfully")
-            
-        except Exception as e:
-            print(f"     ❌ Error extracting Safety KPIs: {e}")
-        
-        # Extract Combined KPIs
-        print("   - Extracting Combined KPIs...")
-        try:
-            combined_data = combined_extractor.extract_all_kpis(start_date, end_date)
-            
-            combined_file = kpi_data_dir / f"combined_kpis_{timestamp}.json"
-            with open(combined_file, 'w', encoding='utf-8') as f:
-                json.dump(combined_data, f, indent=2, default=str)
-            files_created.append(str(combined_file))
-            print("     ✅ Combined KPIs extracted successfully")
-            
-        except Exception as e:
-            print(f"     ❌ Error extracting Combined KPIs: {e}")
+        # Extract Operations, Safety and Combined KPIs in parallel worker processes,
+        # writing each file as soon as its extraction finishes
+        print("   - Extracting Operations, Safety and Combined KPIs...")
+        with ProcessPoolExecutor(max_workers=len(KPI_EXTRACTORS)) as pool:
+            futures = {
+                pool.submit(run_extractor, module_name, class_name, start_date, end_date): (label, file_prefix)
+                for label, file_prefix, module_name, class_name in KPI_EXTRACTORS
+            }
+            for future in as_completed(futures):
+                label, file_prefix = futures[future]
+                try:
+                    data = future.result()
+
+                    # orjson encodes datetimes and numpy values natively; anything else still falls back to str
+                    kpi_file = kpi_data_dir / f"{file_prefix}_{timestamp}.json"
+                    kpi_file.write_bytes(orjson.dumps(
+                        data,
+                        default=str,
+                        option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                    ))
+                    files_created.append(str(kpi_file))
+                    print(f"     ✅ {label} KPIs extracted successfully")
+
+                except Exception as e:
+                    print(f"     ❌ Error extracting {label} KPIs: {e}")
         
         if files_created:
             print(f"\n✅ Real KPI data generated successfully!")
@@ -5,22 +5,33 @@ Serves comprehensive logistics and transportation KPIs
 
 import os
 import sys
-import json
+import time
 import uuid
 import asyncio
 import logging
 import hashlib
+import threading
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
+from decimal import Decimal
 from typing import Optional, Dict, Any, List
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 import uvicorn
 from pydantic import BaseModel
 from dotenv import load_dotenv
+import orjson
+
+try:
+    import redis
+except ImportError:  # optional: KPI cache shared across workers and restarts
+    redis = None
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(__file__))
@@ -36,13 +47,52 @@ from ai_insights.insights_generator import AIInsightsGenerator
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+def warm_db_pool() -> None:
+    """Open the shared engine's first pooled connection before any request needs it"""
+    try:
+        with db.get_engine().connect() as conn:
+            conn.exec_driver_sql("SELECT 1")
+        logging.info("Database pool warmed")
+    except Exception as e:
+        logging.warning(f"Database pool warm-up failed: {e}")
+
+async def warm_kpi_cache() -> None:
+    """Extract the default-range KPIs into the cache so the first dashboard load is a cache hit"""
+    start_date, end_date = default_date_range()
+    results = await asyncio.gather(*(get_kpis_or_error(kpi_type, start_date, end_date) for kpi_type in KPI_EXTRACTIONS))
+    failed = [kpi_type for kpi_type, result in zip(KPI_EXTRACTIONS, results) if "error" in result]
+    if failed:
+        logging.warning(f"KPI cache warm-up failed for: {', '.join(failed)}")
+    else:
+        logging.info(f"KPI cache warmed for {start_date} to {end_date}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(warm_db_pool)
+
+    # Opt-in: every worker runs the full default-range extraction at boot
+    warm_task = None
+    if os.getenv("WARM_KPI_CACHE", "false").lower() == "true":
+        # In the background so the server accepts requests immediately; early requests join the same run
+        warm_task = asyncio.create_task(warm_kpi_cache())
+
+    yield
+
+    if warm_task is not None and not warm_task.done():
+        warm_task.cancel()
+    db.close_pool()
+    if redis_client is not None:
+        redis_client.close()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Driver Safety KPI Server",
     description="Comprehensive operations, safety, and combined KPIs for logistics efficiency, route productivity, transporter performance, driver behavior analysis, and overall logistics health",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -55,13 +105,20 @@ app.add_middleware(
     ],
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["*"],
+    # Only what the frontend sends; If-None-Match for chart revalidation
+    allow_headers=["Content-Type", "Authorization", "If-None-Match"],
+    expose_headers=["ETag"],
+    # Let browsers reuse a preflight result for a day (Chromium caps this at 2 hours)
+    max_age=86400,
 )
 
-# Initialize KPI extractors
-operations_kpi_extractor = OperationsKPIExtractor()
-safety_kpi_extractor = SafetyKPIExtractor()
-combined_kpi_extractor = CombinedKPIExtractor()
+# KPI payloads and chart lists are repetitive JSON; compress anything over 1 KB
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# Initialize KPI extractors; their own memo is off because get_kpis caches results in kpi_cache
+operations_kpi_extractor = OperationsKPIExtractor(cache_ttl=0)
+safety_kpi_extractor = SafetyKPIExtractor(cache_ttl=0)
+combined_kpi_extractor = CombinedKPIExtractor(cache_ttl=0)
 
 # Initialize AI Insights Generator
 ai_insights_generator = AIInsightsGenerator()
@@ -69,6 +126,86 @@ ai_insights_generator = AIInsightsGenerator()
 # Initialize KPI Chatbot
 kpi_chatbot = KPIChatbot()
 
+class ChatSessionRegistry:
+    """One chatbot per chat session, all sharing kpi_chatbot's loaded KPI data"""
+
+    def __init__(self, template: KPIChatbot, max_sessions: int = 1000):
+        self.template = template
+        self.max_sessions = max_sessions
+        # Least recently used sessions first
+        self.sessions: "OrderedDict[str, KPIChatbot]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[KPIChatbot]:
+        """Get the chatbot for an active session"""
+        with self._lock:
+            bot = self.sessions.get(session_id)
+            if bot is not None:
+                self.sessions.move_to_end(session_id)
+            return bot
+
+    def _start(self, session_id: Optional[str] = None):
+        bot = self.template.new_session_bot()
+        # Random default IDs: two users starting in the same second must not share a session
+        session_info = bot.start_session(session_id or f"kpi_chat_{uuid.uuid4().hex}")
+        with self._lock:
+            self.sessions[session_info["session_id"]] = bot
+            self.sessions.move_to_end(session_info["session_id"])
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        return bot, session_info
+
+    def start(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Start a session, replacing any existing one with the same ID"""
+        return self._start(session_id)[1]
+
+    def get_or_start(self, session_id: Optional[str] = None) -> KPIChatbot:
+        """Get the session's chatbot, starting the session if it is unknown or was evicted"""
+        bot = self.get(session_id) if session_id else None
+        if bot is None:
+            bot = self._start(session_id)[0]
+        return bot
+
+    def end(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """End and forget a session; None if it is not active"""
+        with self._lock:
+            bot = self.sessions.pop(session_id, None)
+        return bot.end_session() if bot is not None else None
+
+chat_sessions = ChatSessionRegistry(kpi_chatbot)
+
+# Default one-year range as (refreshed_at, start, end); the strings only change once a day
+_default_range_cache = (0.0, "", "")
+
+def default_date_range() -> tuple:
+    """(start_date, end_date) strings for the last year, recomputed at most once a minute"""
+    global _default_range_cache
+    now = time.monotonic()
+    refreshed_at, start_date, end_date = _default_range_cache
+    if not end_date or now - refreshed_at >= 60:
+        today = datetime.now()
+        start_date = (today - timedelta(days=365)).strftime('%Y-%m-%d')
+        end_date = today.strftime('%Y-%m-%d')
+        _default_range_cache = (now, start_date, end_date)
+    return start_date, end_date
+
+# Extractor output can still carry pandas timestamps or Decimals
+KPI_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def kpi_json_default(obj):
+    """orjson fallback for values it does not encode natively"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return str(obj)
+
+class KPIJSONResponse(ORJSONResponse):
+    """Encodes KPI payloads straight to bytes, skipping response-model validation of the whole dict"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=kpi_json_default, option=KPI_ORJSON_OPTIONS)
+
 # KPI Data Cache to prevent redundant extractions
 class KPICache:
     def __init__(self, cache_duration_minutes: int = 5):
@@ -90,8 +227,8 @@ class KPICache:
                 logging.info(f"Cache hit for {kpi_type} KPIs ({start_date} to {end_date})")
                 return cached_data
             else:
-                # Remove expired cache entry
-                del self.cache[cache_key]
+                # Remove expired cache entry (pop: another worker thread may have removed it already)
+                self.cache.pop(cache_key, None)
                 logging.info(f"Cache expired for {kpi_type} KPIs ({start_date} to {end_date})")
 
         return None
@@ -113,7 +250,7 @@ class KPICache:
         expired_entries = 0
 
         current_time = datetime.now()
-        for cached_data, timestamp in self.cache.values():
+        for cached_data, timestamp in list(self.cache.values()):
             if current_time - timestamp >= self.cache_duration:
                 expired_entries += 1
 
@@ -124,60 +261,342 @@ class KPICache:
             "cache_duration_minutes": self.cache_duration.total_seconds() / 60
         }
 
-# Initialize KPI cache with 5-minute duration
-kpi_cache = KPICache(cache_duration_minutes=5)
+class RedisKPICache(KPICache):
+    """KPICache stored in Redis, so every worker and restart shares cached KPI results"""
 
-# Chart storage directory
-CHARTS_DIR = Path("charts")
-CHARTS_DIR.mkdir(exist_ok=True)
+    KEY_PREFIX = "kpi:"
+    # Ranges that ended before today no longer change
+    HISTORICAL_TTL_SECONDS = 24 * 60 * 60
 
-def get_chart_file_path(chart_id: str) -> Path:
-    """Get the file path for a chart configuration"""
-    return CHARTS_DIR / f"{chart_id}.json"
+    def __init__(self, client, cache_duration_minutes: int = 5):
+        super().__init__(cache_duration_minutes)
+        self.client = client
 
-def save_chart_to_file(chart_id: str, chart_data: dict) -> None:
-    """Save chart configuration to file"""
-    file_path = get_chart_file_path(chart_id)
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(chart_data, f, indent=2, ensure_ascii=False)
+    def _generate_cache_key(self, start_date: str, end_date: str, kpi_type: str) -> str:
+        """Readable key so entries can be inspected and cleared by prefix"""
+        return f"{self.KEY_PREFIX}{kpi_type}:{start_date}:{end_date}"
 
-def load_chart_from_file(chart_id: str) -> Optional[dict]:
-    """Load chart configuration from file"""
-    file_path = get_chart_file_path(chart_id)
-    if not file_path.exists():
-        return None
+    def _ttl_seconds(self, end_date: str) -> int:
+        if end_date < default_date_range()[1]:
+            return self.HISTORICAL_TTL_SECONDS
+        return int(self.cache_duration.total_seconds())
+
+    def get(self, start_date: str, end_date: str, kpi_type: str) -> Optional[Dict]:
+        """Get cached KPI data; Redis errors are logged and treated as a miss"""
+        try:
+            cached = self.client.get(self._generate_cache_key(start_date, end_date, kpi_type))
+        except redis.RedisError as e:
+            logging.warning(f"Redis KPI cache read failed: {e}")
+            return None
+        if cached is None:
+            return None
+        logging.info(f"Cache hit for {kpi_type} KPIs ({start_date} to {end_date})")
+        return orjson.loads(cached)
 
+    def set(self, start_date: str, end_date: str, kpi_type: str, data: Dict) -> None:
+        """Cache KPI data with a TTL; Redis errors are logged and the result is simply not cached"""
+        try:
+            self.client.set(
+                self._generate_cache_key(start_date, end_date, kpi_type),
+                orjson.dumps(data, default=kpi_json_default, option=KPI_ORJSON_OPTIONS),
+                ex=self._ttl_seconds(end_date)
+            )
+            logging.info(f"Cached {kpi_type} KPIs ({start_date} to {end_date})")
+        except redis.RedisError as e:
+            logging.warning(f"Redis KPI cache write failed: {e}")
+
+    def clear(self) -> None:
+        """Clear all cached KPI data"""
+        try:
+            keys = list(self.client.scan_iter(match=f"{self.KEY_PREFIX}*"))
+            if keys:
+                self.client.delete(*keys)
+            logging.info("KPI cache cleared")
+        except redis.RedisError as e:
+            logging.warning(f"Redis KPI cache clear failed: {e}")
+
+    def get_cache_stats(self) -> Dict:
+        """Get cache statistics; Redis drops expired entries itself. Redis errors are logged and reported in the stats"""
+        try:
+            total_entries = sum(1 for _ in self.client.scan_iter(match=f"{self.KEY_PREFIX}*"))
+        except redis.RedisError as e:
+            logging.warning(f"Redis KPI cache stats failed: {e}")
+            return {
+                "backend": "redis",
+                "error": f"Redis unavailable: {e}",
+                "cache_duration_minutes": self.cache_duration.total_seconds() / 60,
+                "historical_cache_duration_minutes": self.HISTORICAL_TTL_SECONDS / 60
+            }
+        return {
+            "backend": "redis",
+            "total_entries": total_entries,
+            "active_entries": total_entries,
+            "expired_entries": 0,
+            "cache_duration_minutes": self.cache_duration.total_seconds() / 60,
+            "historical_cache_duration_minutes": self.HISTORICAL_TTL_SECONDS / 60
+        }
+
+def create_redis_client():
+    """Connect to REDIS_URL when it is set and reachable, otherwise return None"""
+    redis_url = os.getenv("REDIS_URL")
+    if redis is None or not redis_url:
+        return None
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
+        client = redis.Redis.from_url(redis_url)
+        client.ping()
+        return client
+    except redis.RedisError as e:
+        logging.warning(f"Redis unavailable ({e}), falling back to in-process KPI cache and file chart storage")
         return None
 
-def delete_chart_file(chart_id: str) -> bool:
-    """Delete chart configuration file"""
-    file_path = get_chart_file_path(chart_id)
-    if file_path.exists():
+def create_kpi_cache(redis_client=None, cache_duration_minutes: int = 5) -> KPICache:
+    """Use Redis when a client is available, otherwise the in-process cache"""
+    if redis_client is not None:
+        logging.info("Using Redis KPI cache")
+        return RedisKPICache(redis_client, cache_duration_minutes)
+    return KPICache(cache_duration_minutes=cache_duration_minutes)
+
+redis_client = create_redis_client()
+
+# Initialize KPI cache with 5-minute duration
+kpi_cache = create_kpi_cache(redis_client, cache_duration_minutes=5)
+
+# Full extraction per KPI type, awaited off the event loop
+KPI_EXTRACTIONS = {
+    "operations": lambda start_date, end_date: asyncio.to_thread(operations_kpi_extractor.extract_all_kpis, start_date, end_date),
+    "safety": safety_kpi_extractor.extract_all_kpis_async,
+    "combined": lambda start_date, end_date: asyncio.to_thread(combined_kpi_extractor.extract_all_kpis, start_date, end_date),
+}
+
+# Extractions currently running, keyed by (kpi_type, start_date, end_date)
+_inflight_extractions: Dict[tuple, asyncio.Task] = {}
+
+async def single_flight(key: tuple, compute) -> Any:
+    """Run compute() once per key at a time; concurrent callers with the same key await the same task"""
+    task = _inflight_extractions.get(key)
+    if task is None:
+        task = asyncio.ensure_future(compute())
+        _inflight_extractions[key] = task
+        task.add_done_callback(lambda _: _inflight_extractions.pop(key, None))
+    # Shielded so one client disconnecting does not cancel the run the others are waiting on
+    return await asyncio.shield(task)
+
+async def get_kpis(kpi_type: str, start_date: str, end_date: str) -> Dict:
+    """Cached KPIs for the range; concurrent cache misses for the same range share one extraction"""
+    # kpi_cache may be Redis-backed (a blocking client), so every cache call runs in a worker thread
+    cached_data = await asyncio.to_thread(kpi_cache.get, start_date, end_date, kpi_type)
+    if cached_data:
+        return cached_data
+
+    async def extract_and_cache() -> Dict:
+        data = await KPI_EXTRACTIONS[kpi_type](start_date, end_date)
+        await asyncio.to_thread(kpi_cache.set, start_date, end_date, kpi_type, data)
+        return data
+
+    return await single_flight((kpi_type, start_date, end_date), extract_and_cache)
+
+def clear_kpi_caches() -> None:
+    """
+    Drop cached KPI results: kpi_cache, plus the memo of the AI insights generator's own extractors
+    (only used when insights are generated without data from get_kpis)
+    """
+    kpi_cache.clear()
+    for extractor in (
+        ai_insights_generator.operations_extractor,
+        ai_insights_generator.safety_extractor,
+        ai_insights_generator.combined_extractor,
+    ):
+        extractor.clear_cache()
+
+async def get_kpis_or_error(kpi_type: str, start_date: str, end_date: str) -> Dict:
+    """get_kpis for multi-source endpoints: a failed extraction becomes {"error": ...} instead of raising"""
+    try:
+        return await get_kpis(kpi_type, start_date, end_date)
+    except Exception as e:
+        logging.error(f"Error in {kpi_type} KPI extraction: {e}")
+        return {"error": str(e)}
+
+# Chart storage directory
+CHARTS_DIR = Path("charts")
+CHARTS_DIR.mkdir(exist_ok=True)
+
+class FileChartStore:
+    """Chart configurations stored as one JSON file per chart"""
+
+    READ_WORKERS = 8
+
+    def __init__(self, charts_dir: Path):
+        self.charts_dir = charts_dir
+        # Listing cache: (version, charts), rebuilt only after charts change
+        self._charts_cache = None
+        self._local_version = 0
+        self._cache_lock = threading.Lock()
+
+    def _version(self) -> tuple:
+        """Bumped by this process's writes; the directory mtime covers other workers"""
+        return (self.charts_dir.stat().st_mtime_ns, self._local_version)
+
+    def _mark_changed(self) -> None:
+        # Overwriting an existing file does not change the directory mtime, so touch it
+        os.utime(self.charts_dir)
+        # += is a read-modify-write; concurrent saves/deletes could otherwise lose a bump
+        with self._cache_lock:
+            self._local_version += 1
+
+    def get_chart_file_path(self, chart_id: str) -> Path:
+        """Get the file path for a chart configuration"""
+        return self.charts_dir / f"{chart_id}.json"
+
+    def save(self, chart_id: str, chart_data: dict) -> None:
+        """Save chart configuration to file"""
+        self.get_chart_file_path(chart_id).write_bytes(orjson.dumps(chart_data, option=orjson.OPT_INDENT_2))
+        self._mark_changed()
+
+    def load(self, chart_id: str) -> Optional[dict]:
+        """Load chart configuration from file"""
+        # A missing chart surfaces as FileNotFoundError; no separate exists() stat
+        raw = self._read_file(str(self.get_chart_file_path(chart_id)))
+        if raw is None:
+            return None
+
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            return None
+
+    def delete(self, chart_id: str) -> bool:
+        """Delete chart configuration file"""
         try:
-            file_path.unlink()
-            return True
+            os.unlink(self.get_chart_file_path(chart_id))
         except OSError:
+            # Includes FileNotFoundError for charts that do not exist
             return False
-    return False
-
-def list_all_charts() -> List[dict]:
-    """List all saved chart configurations"""
-    charts = []
-    for file_path in CHARTS_DIR.glob("*.json"):
+        self._mark_changed()
+        return True
+
+    def list_all(self) -> List[dict]:
+        """List all saved chart configurations; the returned list is shared, do not mutate it"""
+        with self._cache_lock:
+            version = self._version()
+            if self._charts_cache is not None and self._charts_cache[0] == version:
+                return self._charts_cache[1]
+
+            charts = self._read_all()
+            self._charts_cache = (version, charts)
+            return charts
+
+    @staticmethod
+    def _read_file(path: str) -> Optional[bytes]:
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _read_all(self) -> List[dict]:
+        with os.scandir(self.charts_dir) as entries:
+            paths = [entry.path for entry in entries if entry.name.endswith(".json") and entry.is_file()]
+
+        # File reads release the GIL, so overlap them; parsing stays on this thread
+        charts = []
+        if paths:
+            with ThreadPoolExecutor(max_workers=min(self.READ_WORKERS, len(paths))) as executor:
+                raws = list(executor.map(self._read_file, paths))
+            for raw in raws:
+                if raw is None:
+                    continue
+                try:
+                    charts.append(orjson.loads(raw))
+                except orjson.JSONDecodeError:
+                    continue
+
+        # Sort by created_at timestamp (newest first)
+        charts.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+        return charts
+
+class RedisChartStore:
+    """Chart configurations in a Redis hash, with a sorted set ordering them by creation time"""
+
+    CHARTS_KEY = "charts"
+    CREATED_INDEX_KEY = "charts:by_created"
+    # IDs of file charts already imported, so a restart does not resurrect deleted ones
+    IMPORTED_KEY = "charts:imported_files"
+
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def _created_score(chart_data: dict) -> float:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                chart_data = json.load(f)
-                charts.append(chart_data)
-        except (json.JSONDecodeError, IOError):
-            continue
+            return datetime.fromisoformat(chart_data.get('created_at', '')).timestamp()
+        except ValueError:
+            return 0.0
+
+    def save(self, chart_id: str, chart_data: dict) -> None:
+        """Save chart configuration and (re)index it by creation time"""
+        pipe = self.client.pipeline()
+        pipe.hset(self.CHARTS_KEY, chart_id, orjson.dumps(chart_data))
+        pipe.zadd(self.CREATED_INDEX_KEY, {chart_id: self._created_score(chart_data)})
+        pipe.execute()
+
+    def load(self, chart_id: str) -> Optional[dict]:
+        """Load chart configuration"""
+        raw = self.client.hget(self.CHARTS_KEY, chart_id)
+        return orjson.loads(raw) if raw is not None else None
+
+    def delete(self, chart_id: str) -> bool:
+        """Delete chart configuration and its index entry"""
+        pipe = self.client.pipeline()
+        pipe.hdel(self.CHARTS_KEY, chart_id)
+        pipe.zrem(self.CREATED_INDEX_KEY, chart_id)
+        deleted, _ = pipe.execute()
+        return bool(deleted)
+
+    def list_all(self) -> List[dict]:
+        """List all saved chart configurations, newest first"""
+        chart_ids = self.client.zrevrange(self.CREATED_INDEX_KEY, 0, -1)
+        if not chart_ids:
+            return []
+        return [orjson.loads(raw) for raw in self.client.hmget(self.CHARTS_KEY, chart_ids) if raw is not None]
+
+    def import_charts(self, source: FileChartStore) -> int:
+        """Copy charts saved as files into Redis once; charts deleted afterwards stay deleted"""
+        charts = [chart_data for chart_data in source.list_all() if chart_data.get('id')]
+        if not charts:
+            return 0
+
+        # Two round trips in total: mark every file chart as imported, then write the ones not imported before
+        pipe = self.client.pipeline()
+        for chart_data in charts:
+            pipe.sadd(self.IMPORTED_KEY, chart_data['id'])
+        new_charts = [chart_data for chart_data, added in zip(charts, pipe.execute()) if added]
+        if not new_charts:
+            return 0
+
+        pipe = self.client.pipeline()
+        for chart_data in new_charts:
+            chart_id = chart_data['id']
+            # NX on both, so a chart already saved through the API under the same ID is left untouched
+            pipe.hsetnx(self.CHARTS_KEY, chart_id, orjson.dumps(chart_data))
+            pipe.zadd(self.CREATED_INDEX_KEY, {chart_id: self._created_score(chart_data)}, nx=True)
+        return sum(pipe.execute()[::2])
+
+def create_chart_store(redis_client=None):
+    """Store charts in Redis when a client is available, otherwise as files in CHARTS_DIR"""
+    file_store = FileChartStore(CHARTS_DIR)
+    if redis_client is None:
+        return file_store
+
+    store = RedisChartStore(redis_client)
+    try:
+        imported = store.import_charts(file_store)
+    except redis.RedisError as e:
+        logging.warning(f"Redis chart storage unavailable ({e}), using file chart storage")
+        return file_store
+    logging.info(f"Using Redis chart storage ({imported} charts imported from {CHARTS_DIR})")
+    return store
 
-    # Sort by created_at timestamp (newest first)
-    charts.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-    return charts
+chart_store = create_chart_store(redis_client)
 
 # Pydantic models for request/response
 class KPIRequest(BaseModel):
@@ -259,74 +678,79 @@ class ChartListResponse(BaseModel):
     charts: List[ChartResponse]
     total: int
 
+# The root payload never changes: build and encode it once at import
+ROOT_PAYLOAD = {
+    "message": "Driver Safety KPI Server",
+    "version": "1.0.0",
+    "description": "Comprehensive operations, safety, and combined KPIs for logistics efficiency, route productivity, transporter performance, driver behavior analysis, and overall logistics health",
+    "endpoints": {
+        "operations_kpis": "/api/operations-kpis",
+        "safety_kpis": "/api/safety-kpis",
+        "combined_kpis": "/api/combined-kpis",
+        "all_kpis_parallel": "/api/all-kpis-parallel",
+        "ai_insights": "/api/ai-insights",
+        "health": "/health",
+        "chatbot": "/api/chat",
+        "chatbot_session": "/api/chat/session"
+    },
+    "operations_kpis_included": [
+        "Turnaround Time (TAT) at plant, warehouse, delivery point",
+        "Trip Count per Vehicle per Day",
+        "Trip Distance vs Planned Distance",
+        "Vehicle Utilization Rate (active driving time vs idle)",
+        "On-time Arrival Rate",
+        "Trip Delays (%) – beyond scheduled departure/arrival",
+        "Transporter-wise Performance Score",
+        "Missed Delivery",
+        "Geo-deviation Events (off-route movement)",
+        "Loading/Unloading Time per Stop",
+        "Planned vs Actual Delivery Volume",
+        "Maintenance Downtime (hrs/vehicle/month)"
+    ],
+    "safety_kpis_included": [
+        "Driving Safety Score",
+        "Phone Usage During Trip (incidence rate)",
+        "Overspeeding Events per 100 km",
+        "Harsh Braking / Acceleration / Cornering Events per Trip",
+        "Non-compliance with Rest Time (fatigue risk)",
+        "High-Risk Trips (based on composite score thresholds)",
+        "Incident Heatmaps (location-based trends)",
+        "Repeat Offenders (driver-level behavior history)",
+        "Checklist Compliance Rate (e.g., daily inspection, onboarding)",
+        "Accident/Near-Miss Flags (manual reporting or system detection)",
+        "Fatigue Scoring"
+    ],
+    "combined_kpis_included": [
+        "Safe On-Time Delivery Rate (trips that are both safe and on-time)",
+        "Driver Risk vs TAT Heatmap (correlation between speed and safety)",
+        "Top 10 Routes by Risk-Weighted Efficiency",
+        "R&R Eligible Trips (meets combined criteria across ops and safety)",
+        "Driver Engagement Index (training content, checklist use, driving score)",
+        "Transporter Composite Score (combining safety and operational metrics)",
+        "Fatigue Risk by Route Length and Time of Day",
+        "Driver Performance Index (Ops + Safety blend) – Composite driver score factoring delivery metrics and driving behaviour"
+    ]
+}
+ROOT_JSON = orjson.dumps(ROOT_PAYLOAD)
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
-    return {
-        "message": "Driver Safety KPI Server",
-        "version": "1.0.0",
-        "description": "Comprehensive operations, safety, and combined KPIs for logistics efficiency, route productivity, transporter performance, driver behavior analysis, and overall logistics health",
-        "endpoints": {
-            "operations_kpis": "/api/operations-kpis",
-            "safety_kpis": "/api/safety-kpis",
-            "combined_kpis": "/api/combined-kpis",
-            "all_kpis_parallel": "/api/all-kpis-parallel",
-            "ai_insights": "/api/ai-insights",
-            "health": "/health",
-            "chatbot": "/api/chat",
-            "chatbot_session": "/api/chat/session"
-        },
-        "operations_kpis_included": [
-            "Turnaround Time (TAT) at plant, warehouse, delivery point",
-            "Trip Count per Vehicle per Day",
-            "Trip Distance vs Planned Distance",
-            "Vehicle Utilization Rate (active driving time vs idle)",
-            "On-time Arrival Rate",
-            "Trip Delays (%) – beyond scheduled departure/arrival",
-            "Transporter-wise Performance Score",
-            "Missed Delivery",
-            "Geo-deviation Events (off-route movement)",
-            "Loading/Unloading Time per Stop",
-            "Planned vs Actual Delivery Volume",
-            "Maintenance Downtime (hrs/vehicle/month)"
-        ],
-        "safety_kpis_included": [
-            "Driving Safety Score",
-            "Phone Usage During Trip (incidence rate)",
-            "Overspeeding Events per 100 km",
-            "Harsh Braking / Acceleration / Cornering Events per Trip",
-            "Non-compliance with Rest Time (fatigue risk)",
-            "High-Risk Trips (based on composite score thresholds)",
-            "Incident Heatmaps (location-based trends)",
-            "Repeat Offenders (driver-level behavior history)",
-            "Checklist Compliance Rate (e.g., daily inspection, onboarding)",
-            "Accident/Near-Miss Flags (manual reporting or system detection)",
-            "Fatigue Scoring"
-        ],
-        "combined_kpis_included": [
-            "Safe On-Time Delivery Rate (trips that are both safe and on-time)",
-            "Driver Risk vs TAT Heatmap (correlation between speed and safety)",
-            "Top 10 Routes by Risk-Weighted Efficiency",
-            "R&R Eligible Trips (meets combined criteria across ops and safety)",
-            "Driver Engagement Index (training content, checklist use, driving score)",
-            "Transporter Composite Score (combining safety and operational metrics)",
-            "Fatigue Risk by Route Length and Time of Day",
-            "Driver Performance Index (Ops + Safety blend) – Composite driver score factoring delivery metrics and driving behaviour"
-        ]
-    }
+    return Response(content=ROOT_JSON, media_type="application/json", headers={"Cache-Control": "public, max-age=3600"})
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     try:
-        db_status = db.test_connection()
+        # Blocking driver call; keep it off the event loop so /health stays responsive under load
+        db_status = await asyncio.to_thread(db.test_connection)
         return {
             "status": "healthy" if db_status else "unhealthy",
             "database": "connected" if db_status else "disconnected",
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=503,
             content={
                 "status": "unhealthy",
@@ -360,27 +784,20 @@ async def get_operations_kpis(
     """
     try:
         # Set default dates if not provided
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
-        if not end_date:
-            end_date = datetime.now().strftime('%Y-%m-%d')
-
-        # Check cache first
-        cached_data = kpi_cache.get(start_date, end_date, "operations")
-        if cached_data:
-            kpis = cached_data
-        else:
-            # Extract all operations KPIs
-            kpis = operations_kpi_extractor.extract_all_kpis(start_date, end_date)
-            # Cache the result
-            kpi_cache.set(start_date, end_date, "operations", kpis)
-
-        return KPIResponse(
-            success=True,
-            data=kpis,
-            message=f"All 12 Operations KPIs extracted successfully for period {start_date} to {end_date} (default: 1 year)",
-            extraction_timestamp=datetime.now().isoformat()
-        )
+        default_start, default_end = default_date_range()
+        start_date = start_date or default_start
+        end_date = end_date or default_end
+
+        # Cached, or extracted off the event loop (once for concurrent identical requests)
+        kpis = await get_kpis("operations", start_date, end_date)
+
+        # response_model stays for the API docs; returning the response directly skips re-validating the KPI dict
+        return KPIJSONResponse({
+            "success": True,
+            "data": kpis,
+            "message": f"All 12 Operations KPIs extracted successfully for period {start_date} to {end_date} (default: 1 year)",
+            "extraction_timestamp": datetime.now().isoformat()
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error extracting Operations KPIs: {str(e)}")
 
@@ -407,27 +824,19 @@ async def get_safety_kpis(
     """
     try:
         # Set default dates if not provided
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
-        if not end_date:
-            end_date = datetime.now().strftime('%Y-%m-%d')
-
-        # Check cache first
-        cached_data = kpi_cache.get(start_date, end_date, "safety")
-        if cached_data:
-            kpis = cached_data
-        else:
-            # Extract all safety KPIs
-            kpis = safety_kpi_extractor.extract_all_kpis(start_date, end_date)
-            # Cache the result
-            kpi_cache.set(start_date, end_date, "safety", kpis)
-
-        return KPIResponse(
-            success=True,
-            data=kpis,
-            message=f"All 11 Safety KPIs extracted successfully for period {start_date} to {end_date} (default: 1 year)",
-            extraction_timestamp=datetime.now().isoformat()
-        )
+        default_start, default_end = default_date_range()
+        start_date = start_date or default_start
+        end_date = end_date or default_end
+
+        # Cached, or extracted off the event loop (once for concurrent identical requests)
+        kpis = await get_kpis("safety", start_date, end_date)
+
+        return KPIJSONResponse({
+            "success": True,
+            "data": kpis,
+            "message": f"All 11 Safety KPIs extracted successfully for period {start_date} to {end_date} (default: 1 year)",
+            "extraction_timestamp": datetime.now().isoformat()
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error extracting Safety KPIs: {str(e)}")
 
@@ -451,87 +860,21 @@ async def get_combined_kpis(
     """
     try:
         # Set default dates if not provided
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
-        if not end_date:
-            end_date = datetime.now().strftime('%Y-%m-%d')
-
-        # Check cache first
-        cached_data = kpi_cache.get(start_date, end_date, "combined")
-        if cached_data:
-            kpis = cached_data
-        else:
-            # Extract all combined KPIs
-            kpis = combined_kpi_extractor.extract_all_kpis(start_date, end_date)
-            # Cache the result
-            kpi_cache.set(start_date, end_date, "combined", kpis)
-
-        return KPIResponse(
-            success=True,
-            data=kpis,
-            message=f"All 8 Combined KPIs extracted successfully for period {start_date} to {end_date} (default: 1 year)",
-            extraction_timestamp=datetime.now().isoformat()
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error extracting Combined KPIs: {str(e)}")
-
-# Parallel KPI Execution Functions with Caching
-def extract_operations_kpis_sync(start_date: str, end_date: str) -> Dict:
-    """Synchronous wrapper for operations KPI extraction with caching"""
-    try:
-        # Check cache first
-        cached_data = kpi_cache.get(start_date, end_date, "operations")
-        if cached_data:
-            return cached_data
-
-        # Extract fresh data if not cached
-        data = operations_kpi_extractor.extract_all_kpis(start_date, end_date)
-
-        # Cache the result
-        kpi_cache.set(start_date, end_date, "operations", data)
-
-        return data
-    except Exception as e:
-        logging.error(f"Error in operations KPI extraction: {e}")
-        return {"error": str(e)}
+        default_start, default_end = default_date_range()
+        start_date = start_date or default_start
+        end_date = end_date or default_end
 
-def extract_safety_kpis_sync(start_date: str, end_date: str) -> Dict:
-    """Synchronous wrapper for safety KPI extraction with caching"""
-    try:
-        # Check cache first
-        cached_data = kpi_cache.get(start_date, end_date, "safety")
-        if cached_data:
-            return cached_data
-
-        # Extract fresh data if not cached
-        data = safety_kpi_extractor.extract_all_kpis(start_date, end_date)
-
-        # Cache the result
-        kpi_cache.set(start_date, end_date, "safety", data)
-
-        return data
-    except Exception as e:
-        logging.error(f"Error in safety KPI extraction: {e}")
-        return {"error": str(e)}
+        # Cached, or extracted off the event loop (once for concurrent identical requests)
+        kpis = await get_kpis("combined", start_date, end_date)
 
-def extract_combined_kpis_sync(start_date: str, end_date: str) -> Dict:
-    """Synchronous wrapper for combined KPI extraction with caching"""
-    try:
-        # Check cache first
-        cached_data = kpi_cache.get(start_date, end_date, "combined")
-        if cached_data:
-            return cached_data
-
-        # Extract fresh data if not cached
-        data = combined_kpi_extractor.extract_all_kpis(start_date, end_date)
-
-        # Cache the result
-        kpi_cache.set(start_date, end_date, "combined", data)
-
-        return data
+        return KPIJSONResponse({
+            "success": True,
+            "data": kpis,
+            "message": f"All 8 Combined KPIs extracted successfully for period {start_date} to {end_date} (default: 1 year)",
+            "extraction_timestamp": datetime.now().isoformat()
+        })
     except Exception as e:
-        logging.error(f"Error in combined KPI extraction: {e}")
-        return {"error": str(e)}
+        raise HTTPException(status_code=500, detail=f"Error extracting Combined KPIs: {str(e)}")
 
 @app.get("/api/all-kpis-parallel")
 async def get_all_kpis_parallel(
@@ -541,7 +884,7 @@ async def get_all_kpis_parallel(
     """
     Get ALL KPIs (Operations, Safety, and Combined) executed in parallel for maximum performance
 
-    This endpoint executes all three KPI extractors simultaneously using asyncio and ThreadPoolExecutor,
+    This endpoint executes all three KPI extractors simultaneously using asyncio worker threads,
     significantly reducing total execution time compared to sequential execution.
 
     Returns:
@@ -552,31 +895,18 @@ async def get_all_kpis_parallel(
     """
     try:
         # Set default dates if not provided
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
-        if not end_date:
-            end_date = datetime.now().strftime('%Y-%m-%d')
+        default_start, default_end = default_date_range()
+        start_date = start_date or default_start
+        end_date = end_date or default_end
 
         start_time = datetime.now()
 
-        # Execute all KPI extractions in parallel using ThreadPoolExecutor
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            # Submit all tasks to the thread pool
-            operations_future = loop.run_in_executor(
-                executor, extract_operations_kpis_sync, start_date, end_date
-            )
-            safety_future = loop.run_in_executor(
-                executor, extract_safety_kpis_sync, start_date, end_date
-            )
-            combined_future = loop.run_in_executor(
-                executor, extract_combined_kpis_sync, start_date, end_date
-            )
-
-            # Wait for all tasks to complete
-            operations_kpis, safety_kpis, combined_kpis = await asyncio.gather(
-                operations_future, safety_future, combined_future
-            )
+        # Run all KPI extractions concurrently (cached results are reused)
+        operations_kpis, safety_kpis, combined_kpis = await asyncio.gather(
+            get_kpis_or_error("operations", start_date, end_date),
+            get_kpis_or_error("safety", start_date, end_date),
+            get_kpis_or_error("combined", start_date, end_date)
+        )
 
         end_time = datetime.now()
         total_execution_time = (end_time - start_time).total_seconds()
@@ -590,7 +920,7 @@ async def get_all_kpis_parallel(
         if "error" in combined_kpis:
             errors.append(f"Combined KPIs: {combined_kpis['error']}")
 
-        return {
+        return KPIJSONResponse({
             "success": True,
             "data": {
                 "operations_kpis": operations_kpis,
@@ -602,12 +932,12 @@ async def get_all_kpis_parallel(
                 "parallel_execution": True,
                 "extractors_used": 3,
                 "date_range": {"start": start_date, "end": end_date},
-                "cache_stats": kpi_cache.get_cache_stats()
+                "cache_stats": await asyncio.to_thread(kpi_cache.get_cache_stats)
             },
             "errors": errors if errors else None,
             "message": f"All KPIs extracted in parallel successfully in {total_execution_time:.2f} seconds",
             "extraction_timestamp": end_time.isoformat()
-        }
+        })
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in parallel KPI extraction: {str(e)}")
@@ -636,20 +966,36 @@ async def get_ai_insights(
     """
     try:
         # Set default dates if not provided
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
-        if not end_date:
-            end_date = datetime.now().strftime('%Y-%m-%d')
-
-        # Generate AI insights
-        insights_result = ai_insights_generator.generate_insights(start_date, end_date, more_insights)
-
-        if not insights_result.get('success', False):
-            raise HTTPException(
-                status_code=500,
-                detail=f"Error generating AI insights: {insights_result.get('error', 'Unknown error')}"
+        default_start, default_end = default_date_range()
+        start_date = start_date or default_start
+        end_date = end_date or default_end
+
+        # Standard insights are cached like KPIs; "more insights" asks for a fresh set every time
+        insights_result = None if more_insights else await asyncio.to_thread(kpi_cache.get, start_date, end_date, "ai_insights")
+        if insights_result is None:
+            # Reuse the KPI results the dashboard endpoints cached for this range; only misses are extracted
+            operations_data, safety_data, combined_data = await asyncio.gather(
+                get_kpis_or_error("operations", start_date, end_date),
+                get_kpis_or_error("safety", start_date, end_date),
+                get_kpis_or_error("combined", start_date, end_date)
             )
 
+            # Generate AI insights (the AI call runs in a worker thread)
+            insights_result = await ai_insights_generator.generate_insights_async(
+                start_date, end_date, more_insights,
+                operations_data=operations_data,
+                safety_data=safety_data,
+                combined_data=combined_data
+            )
+
+            if not insights_result.get('success', False):
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Error generating AI insights: {insights_result.get('error', 'Unknown error')}"
+                )
+            if not more_insights and not insights_result.get('fallback_mode'):
+                await asyncio.to_thread(kpi_cache.set, start_date, end_date, "ai_insights", insights_result)
+
         return AIInsightsResponse(
             success=insights_result['success'],
             insights=insights_result['insights'],
@@ -692,18 +1038,11 @@ async def chat_with_kpi_bot(request: ChatRequest):
     - "What are the main operational bottlenecks?"
     """
     try:
-        # Start session if not provided
-        if request.session_id:
-            # Check if session exists, if not start new one
-            if not kpi_chatbot.session_id or kpi_chatbot.session_id != request.session_id:
-                kpi_chatbot.start_session(request.session_id)
-        else:
-            # Start new session
-            session_info = kpi_chatbot.start_session()
-            request.session_id = session_info["session_id"]
-
-        # Process chat message
-        response = kpi_chatbot.chat(request.message)
+        # Each session has its own chatbot; a missing or unknown session ID starts a new session
+        bot = chat_sessions.get_or_start(request.session_id)
+
+        # Process chat message off the event loop (blocking AI call)
+        response = await asyncio.to_thread(bot.chat, request.message)
 
         return ChatResponse(
             success=response.get("success", True),
@@ -718,15 +1057,21 @@ async def chat_with_kpi_bot(request: ChatRequest):
         raise HTTPException(status_code=500, detail=f"Error in chat: {str(e)}")
 
 @app.get("/api/chat/session")
-async def get_chat_session_info():
-    """Get current chat session information"""
+async def get_chat_session_info(session_id: Optional[str] = None):
+    """Get chat session information (without a session_id, only the shared KPI data and AI client status)"""
     try:
-        session_info = kpi_chatbot.get_session_info()
+        bot = chat_sessions.get(session_id) if session_id else kpi_chatbot
+        if bot is None:
+            raise HTTPException(status_code=404, detail="Chat session not found")
+
+        session_info = bot.get_session_info()
         return {
             "success": True,
             "data": session_info,
             "message": "Session information retrieved successfully"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting session info: {str(e)}")
 
@@ -734,7 +1079,7 @@ async def get_chat_session_info():
 async def start_chat_session(session_id: Optional[str] = None):
     """Start a new chat session"""
     try:
-        session_info = kpi_chatbot.start_session(session_id)
+        session_info = chat_sessions.start(session_id)
         return {
             "success": True,
             "data": session_info,
@@ -744,15 +1089,19 @@ async def start_chat_session(session_id: Optional[str] = None):
         raise HTTPException(status_code=500, detail=f"Error starting session: {str(e)}")
 
 @app.post("/api/chat/session/end")
-async def end_chat_session():
-    """End current chat session"""
+async def end_chat_session(session_id: str):
+    """End a chat session (session_id is required: every session has its own chatbot)"""
     try:
-        session_summary = kpi_chatbot.end_session()
+        session_summary = chat_sessions.end(session_id)
+        if session_summary is None:
+            raise HTTPException(status_code=404, detail="Chat session not found")
         return {
             "success": True,
             "data": session_summary,
             "message": "Chat session ended successfully"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error ending session: {str(e)}")
 
@@ -760,7 +1109,9 @@ async def end_chat_session():
 async def refresh_kpi_data():
     """Refresh KPI data for chatbot"""
     try:
-        refresh_result = kpi_chatbot.refresh_kpi_data()
+        refresh_result = await asyncio.to_thread(kpi_chatbot.refresh_kpi_data)
+        # Fresh data invalidates every cached KPI result
+        await asyncio.to_thread(clear_kpi_caches)
         return refresh_result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error refreshing KPI data: {str(e)}")
@@ -776,11 +1127,29 @@ async def get_kpi_categories():
 
 # Chart Storage Endpoints
 
+def new_chart_id() -> str:
+    """32 hex chars like uuid4().hex, but prefixed with the creation time in ms so IDs sort by age"""
+    return f"{time.time_ns() // 1_000_000:012x}{os.urandom(10).hex()}"
+
+def chart_etag(*parts: Any) -> str:
+    """Weak ETag over the values that change whenever the served charts change"""
+    return f'W/"{hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()}"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """True when the client's If-None-Match already covers this ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return any(tag.strip() in (etag, "*") for tag in if_none_match.split(","))
+
+# Clients may cache chart responses but must revalidate them (cheap 304s) before reuse
+CHART_CACHE_HEADERS = {"Cache-Control": "private, no-cache"}
+
 @app.post("/api/charts", response_model=ChartResponse)
 async def save_chart(request: ChartSaveRequest):
     """Save a new chart configuration"""
     try:
-        chart_id = str(uuid.uuid4())
+        chart_id = new_chart_id()
         timestamp = datetime.now().isoformat()
 
         chart_data = {
@@ -792,35 +1161,60 @@ async def save_chart(request: ChartSaveRequest):
             "updated_at": timestamp
         }
 
-        save_chart_to_file(chart_id, chart_data)
+        await asyncio.to_thread(chart_store.save, chart_id, chart_data)
 
-        return ChartResponse(**chart_data)
+        # Stored charts already have the ChartResponse shape; response_model is kept for the API docs
+        return ORJSONResponse(chart_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving chart: {str(e)}")
 
 @app.get("/api/charts", response_model=ChartListResponse)
-async def get_all_charts():
-    """Get all saved chart configurations"""
+async def get_all_charts(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of charts to return, defaults to all"),
+    offset: int = Query(0, ge=0, description="Number of charts (newest first) to skip"),
+    fields: Optional[str] = Query(None, description="Comma-separated chart fields to return, e.g. id,title,created_at; defaults to all")
+):
+    """Get saved chart configurations, newest first (total is the count of all charts)"""
     try:
-        charts = list_all_charts()
-        chart_responses = [ChartResponse(**chart) for chart in charts]
+        field_names = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+        if field_names:
+            unknown = sorted(set(field_names) - set(ChartResponse.model_fields))
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown chart fields: {', '.join(unknown)}")
 
-        return ChartListResponse(
-            charts=chart_responses,
-            total=len(chart_responses)
-        )
+        charts = await asyncio.to_thread(chart_store.list_all)
+
+        # Any save, update or delete changes the count or the latest updated_at
+        etag = chart_etag(len(charts), max((chart.get('updated_at', '') for chart in charts), default=''), offset, limit, field_names)
+        headers = {"ETag": etag, **CHART_CACHE_HEADERS}
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+
+        page = charts[offset:offset + limit] if limit is not None else charts[offset:]
+        if field_names:
+            page = [{name: chart.get(name) for name in field_names} for chart in page]
+
+        return ORJSONResponse({"charts": page, "total": len(charts)}, headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading charts: {str(e)}")
 
 @app.get("/api/charts/{chart_id}", response_model=ChartResponse)
-async def get_chart(chart_id: str):
+async def get_chart(chart_id: str, request: Request):
     """Get a specific chart configuration"""
     try:
-        chart_data = load_chart_from_file(chart_id)
+        chart_data = await asyncio.to_thread(chart_store.load, chart_id)
         if not chart_data:
             raise HTTPException(status_code=404, detail="Chart not found")
 
-        return ChartResponse(**chart_data)
+        etag = chart_etag(chart_id, chart_data.get('updated_at', ''))
+        headers = {"ETag": etag, **CHART_CACHE_HEADERS}
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+
+        return ORJSONResponse(chart_data, headers=headers)
     except HTTPException:
         raise
     except Exception as e:
@@ -830,7 +1224,7 @@ async def get_chart(chart_id: str):
 async def update_chart(chart_id: str, request: ChartUpdateRequest):
     """Update an existing chart configuration"""
     try:
-        chart_data = load_chart_from_file(chart_id)
+        chart_data = await asyncio.to_thread(chart_store.load, chart_id)
         if not chart_data:
             raise HTTPException(status_code=404, detail="Chart not found")
 
@@ -844,9 +1238,9 @@ async def update_chart(chart_id: str, request: ChartUpdateRequest):
 
         chart_data["updated_at"] = datetime.now().isoformat()
 
-        save_chart_to_file(chart_id, chart_data)
+        await asyncio.to_thread(chart_store.save, chart_id, chart_data)
 
-        return ChartResponse(**chart_data)
+        return ORJSONResponse(chart_data)
     except HTTPException:
         raise
     except Exception as e:
@@ -856,13 +1250,13 @@ async def update_chart(chart_id: str, request: ChartUpdateRequest):
 async def delete_chart(chart_id: str):
     """Delete a chart configuration"""
     try:
-        chart_data = load_chart_from_file(chart_id)
+        chart_data = await asyncio.to_thread(chart_store.load, chart_id)
         if not chart_data:
             raise HTTPException(status_code=404, detail="Chart not found")
 
-        success = delete_chart_file(chart_id)
+        success = await asyncio.to_thread(chart_store.delete, chart_id)
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to delete chart file")
+            raise HTTPException(status_code=500, detail="Failed to delete chart")
 
         return {"success": True, "message": "Chart deleted successfully"}
     except HTTPException:
@@ -875,7 +1269,7 @@ async def delete_chart(chart_id: str):
 async def get_cache_stats():
     """Get KPI cache statistics"""
     try:
-        stats = kpi_cache.get_cache_stats()
+        stats = await asyncio.to_thread(kpi_cache.get_cache_stats)
         return {
             "success": True,
             "data": stats,
@@ -888,7 +1282,7 @@ async def get_cache_stats():
 async def clear_cache():
     """Clear all cached KPI data"""
     try:
-        kpi_cache.clear()
+        await asyncio.to_thread(clear_kpi_caches)
         return {
             "success": True,
             "message": "KPI cache cleared successfully"
@@ -901,9 +1295,15 @@ if __name__ == "__main__":
     host = os.getenv("SERVER_HOST", "0.0.0.0")
     port = int(os.getenv("SERVER_PORT", 8000))
     debug = os.getenv("DEBUG", "True").lower() == "true"
+    # Each worker holds up to 40 Postgres connections (SQLAlchemy pool 10 + overflow 20, psycopg2 pool 10),
+    # so the default stays inside Postgres' stock max_connections=100; raise WEB_CONCURRENCY with that budget in mind
+    default_workers = min((os.cpu_count() or 1) * 2 + 1, 2)
+    # Auto-reload only supports a single process
+    workers = 1 if debug else int(os.getenv("WEB_CONCURRENCY", default_workers))
     
     print(f"🚀 Starting Driver Safety KPI Server on {host}:{port}")
     print(f"📊 Debug mode: {debug}")
+    print(f"👷 Workers: {workers}")
     print(f"📖 API Documentation: http://{host}:{port}/docs")
     print(f"🔧 Operations KPIs: http://{host}:{port}/api/operations-kpis")
     print(f"🛡️ Safety KPIs: http://{host}:{port}/api/safety-kpis")
@@ -917,6 +1317,10 @@ if __name__ == "__main__":
         "main:app",
         host=host,
         port=port,
+        # uvloop/httptools when installed (uvicorn[standard]), asyncio/h11 otherwise (e.g. Windows)
+        loop="auto",
+        http="auto",
+        workers=workers,
         reload=debug,
         log_level="info" if debug else "warning",
         timeout_keep_alive=300,  # 5 minutes keep-alive timeout
@@ -0,0 +1,22 @@
+-- Safety KPI indexes
+-- Covering indexes for the date-range scans issued by data_extractor/safety_kpi_extractor.py
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block, apply with:
+--   psql "$DATABASE_URL" -f migrations/001_safety_kpi_indexes.sql
+
+-- trip_events filtered by event_time range + type, joined on trip_id
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_trip_events_time_type_trip
+    ON trip_events (event_time, type)
+    INCLUDE (trip_id, speed_kmph, severity, latitude, longitude);
+
+-- Every trip-level KPI filters on completed trips within a departure window
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_trips_completed_departure
+    ON trips (actual_departure_time)
+    INCLUDE (driver_id, actual_distance_km, actual_arrival_time)
+    WHERE status = 'Completed';
+
+-- Incident heatmaps only read geolocated incidents within a time window
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_incident_reports_time_located
+    ON incident_reports (timestamp)
+    INCLUDE (latitude, longitude, type, severity, driver_id)
+    WHERE latitude IS NOT NULL;
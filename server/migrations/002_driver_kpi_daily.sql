@@ -0,0 +1,85 @@
+-- Daily driver KPI rollup
+-- Per-driver, per-day event totals so dashboard queries avoid scanning raw trip_events
+--
+-- Each completed trip (with a recorded distance and at least one event) is counted on the
+-- day it departed, so per-trip figures such as the average overspeed stay exact when days
+-- are summed back up. Apply with:
+--   psql "$DATABASE_URL" -f migrations/002_driver_kpi_daily.sql
+
+CREATE TABLE IF NOT EXISTS driver_kpi_daily (
+    driver_id INTEGER NOT NULL REFERENCES drivers (driver_id),
+    day DATE NOT NULL,
+    trips INTEGER NOT NULL,
+    distance_km DOUBLE PRECISION NOT NULL,
+    overspeeding_events INTEGER NOT NULL,
+    overspeed_trip_avg_sum DOUBLE PRECISION NOT NULL,
+    trips_with_overspeed INTEGER NOT NULL,
+    max_overspeed_kmph DOUBLE PRECISION,
+    phone_events INTEGER NOT NULL,
+    harsh_braking INTEGER NOT NULL,
+    harsh_acceleration INTEGER NOT NULL,
+    harsh_cornering INTEGER NOT NULL,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (driver_id, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_driver_kpi_daily_day ON driver_kpi_daily (day);
+
+-- Recompute every day from `since` onwards; re-running it is safe. Days are replaced
+-- rather than upserted so trips cancelled or edited since the last run drop out.
+CREATE OR REPLACE FUNCTION refresh_driver_kpi_daily(since DATE)
+RETURNS VOID
+LANGUAGE SQL
+AS $$
+    DELETE FROM driver_kpi_daily WHERE day >= since;
+
+    WITH per_trip AS (
+        SELECT
+            t.trip_id,
+            t.driver_id,
+            t.actual_departure_time::date as day,
+            t.actual_distance_km,
+            COUNT(*) FILTER (WHERE te.type = 'overspeeding') as overspeeding_events,
+            AVG(te.speed_kmph) FILTER (WHERE te.type = 'overspeeding') as avg_overspeed_kmph,
+            MAX(te.speed_kmph) FILTER (WHERE te.type = 'overspeeding') as max_overspeed_kmph,
+            COUNT(*) FILTER (WHERE te.type = 'phone_usage') as phone_events,
+            COUNT(*) FILTER (WHERE te.type = 'harsh_braking') as harsh_braking,
+            COUNT(*) FILTER (WHERE te.type = 'harsh_acceleration') as harsh_acceleration,
+            COUNT(*) FILTER (WHERE te.type = 'harsh_cornering') as harsh_cornering
+        FROM trips t
+        JOIN trip_events te ON te.trip_id = t.trip_id
+        WHERE t.actual_departure_time >= since
+        AND t.status = 'Completed'
+        AND t.actual_distance_km IS NOT NULL
+        AND t.actual_distance_km > 0
+        GROUP BY t.trip_id
+    )
+    INSERT INTO driver_kpi_daily (
+        driver_id, day, trips, distance_km, overspeeding_events, overspeed_trip_avg_sum,
+        trips_with_overspeed, max_overspeed_kmph, phone_events, harsh_braking,
+        harsh_acceleration, harsh_cornering, refreshed_at
+    )
+    SELECT
+        driver_id,
+        day,
+        COUNT(*),
+        SUM(actual_distance_km),
+        SUM(overspeeding_events),
+        COALESCE(SUM(avg_overspeed_kmph), 0),
+        COUNT(avg_overspeed_kmph),
+        MAX(max_overspeed_kmph),
+        SUM(phone_events),
+        SUM(harsh_braking),
+        SUM(harsh_acceleration),
+        SUM(harsh_cornering),
+        now()
+    FROM per_trip
+    GROUP BY driver_id, day;
+$$;
+
+-- Initial backfill
+SELECT refresh_driver_kpi_daily('-infinity');
+
+-- Nightly refresh of the trailing week (late events and trip status changes), e.g. with pg_cron:
+--   SELECT cron.schedule('refresh-driver-kpi-daily', '15 2 * * *',
+--                        $$SELECT refresh_driver_kpi_daily(current_date - 7)$$);
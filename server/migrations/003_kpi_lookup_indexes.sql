@@ -0,0 +1,24 @@
+-- KPI lookup indexes
+-- Composite indexes on the join/filter keys used by data_extractor/safety_kpi_extractor.py
+-- (001 covers the time-range scans; these cover the per-trip and per-driver lookups)
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block, apply with:
+--   psql "$DATABASE_URL" -f migrations/003_kpi_lookup_indexes.sql
+
+-- Per-trip event rollups join trip_events on trip_id and filter on type
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_trip_events_trip_type
+    ON trip_events (trip_id, type)
+    INCLUDE (event_id, speed_kmph);
+
+-- Repeat offenders join each driver's incidents within the date range
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_incident_reports_driver_ts
+    ON incident_reports (driver_id, timestamp DESC);
+
+-- Driver-level KPIs (repeat offenders, fatigue) join each driver's completed trips in the range
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_trips_driver_dep
+    ON trips (driver_id, actual_departure_time)
+    WHERE status = 'Completed';
+
+-- Checklist compliance filters on submission_time and groups by driver
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_checklists_submission_driver
+    ON checklists (submission_time, driver_id);
@@ -4,14 +4,35 @@ Test Parallel KPI Execution
 Quick test to verify parallel execution works correctly
 """
 
+import atexit
 import os
 import sys
 import time
 import asyncio
-from datetime import datetime, timedelta
+import hashlib
+import json
+import multiprocessing
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 from dotenv import load_dotenv
 
+try:
+    from pyinstrument import Profiler
+except ImportError:  # optional: KPI_PROFILE=1 profiling of the parallel pass
+    Profiler = None
+
+try:
+    import pytest
+except ImportError:  # optional: the test_* functions below run under pytest; the script itself does not need it
+    pytest = None
+
+try:
+    import uvloop
+except ImportError:  # optional: same event loop the server runs on (uvicorn[standard])
+    uvloop = None
+
 # Load environment variables from the correct path
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
@@ -19,125 +40,294 @@ load_dotenv(dotenv_path=env_path)
 # Add current directory to path
 sys.path.append(os.path.dirname(__file__))
 
-async def test_parallel_execution():
-    """Test parallel KPI execution"""
+from config.database import db
+from data_extractor.operations_kpi_extractor import OperationsKPIExtractor
+from data_extractor.safety_kpi_extractor import SafetyKPIExtractor
+from data_extractor.combined_kpi_extractor import CombinedKPIExtractor
+
+# Time on the loop the server uses, in this process and in spawned benchmark passes
+if uvloop is not None:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+# One worker pool for the whole run, installed as the loop's default executor (asyncio.to_thread uses it)
+KPI_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("KPI_THREAD_POOL_SIZE", "3")),
+    thread_name_prefix="kpi"
+)
+atexit.register(KPI_EXECUTOR.shutdown)
+
+# Extractions allowed to hit the database at once; size to pg max_connections / uvicorn workers / 2
+KPI_DB_CONCURRENCY = int(os.getenv("KPI_DB_CONCURRENCY", "3"))
+
+REQUIRED_KEYS = ('extraction_timestamp', 'date_range')
+
+# KPI sections each extractor must return, in (Operations, Safety, Combined) order
+KPI_SECTIONS = (
+    ('turnaround_time', 'trip_count_per_vehicle', 'distance_variance', 'vehicle_utilization',
+     'on_time_arrival', 'trip_delays', 'transporter_performance', 'missed_deliveries',
+     'geo_deviation_events', 'loading_unloading_time', 'delivery_volume_variance', 'maintenance_downtime'),
+    tuple(name for name, _ in SafetyKPIExtractor.KPI_METHODS),
+    ('safe_on_time_delivery_rate', 'driver_risk_vs_tat_heatmap', 'top_routes_by_risk_weighted_efficiency',
+     'rr_eligible_trips', 'driver_engagement_index', 'transporter_composite_score', 'fatigue_risk_by_route_and_time'),
+)
+
+PROFILE_PATH = Path(__file__).parent / 'parallel.html'
+BENCH_PATH = Path(__file__).parent / 'kpi_bench.json'
+
+def kpi_digest(kpis):
+    """Content hash of a KPI result, ignoring the per-run extraction timestamp"""
+    content = {key: value for key, value in kpis.items() if key != 'extraction_timestamp'}
+    return hashlib.md5(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+def clear_caches(extractors):
+    """Extractors memoize results per date range; clear them so each pass does the real work"""
+    for extractor in extractors:
+        extractor.clear_cache()
+
+async def extract_parallel(extractors, start_date, end_date):
+    """Run the three extractions the way the server does"""
+    operations_extractor, safety_extractor, combined_extractor = extractors
+    semaphore = asyncio.Semaphore(KPI_DB_CONCURRENCY)
+
+    async def bounded(extraction):
+        async with semaphore:
+            return await extraction
+
+    # Same scheduling as the server: safety fans out its own queries, the other two run in worker threads.
+    # TaskGroup cancels the siblings still waiting on the semaphore if one extraction raises.
+    async with asyncio.TaskGroup() as tg:
+        ops_task = tg.create_task(bounded(asyncio.to_thread(operations_extractor.extract_all_kpis, start_date, end_date)))
+        safety_task = tg.create_task(bounded(safety_extractor.extract_all_kpis_async(start_date, end_date)))
+        combined_task = tg.create_task(bounded(asyncio.to_thread(combined_extractor.extract_all_kpis, start_date, end_date)))
+    return ops_task.result(), safety_task.result(), combined_task.result()
+
+async def profile_parallel(extractors, start_date, end_date):
+    """Run the parallel pass under pyinstrument and save the HTML report"""
+    if Profiler is None:
+        print("⚠️ KPI_PROFILE=1 needs pyinstrument (pip install pyinstrument); running unprofiled")
+        return await extract_parallel(extractors, start_date, end_date)
+
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    try:
+        return await extract_parallel(extractors, start_date, end_date)
+    finally:
+        profiler.stop()
+        PROFILE_PATH.write_text(profiler.output_html())
+        print(f"📈 Profile written to {PROFILE_PATH}")
+
+async def check_parallel_integrity(extractors, start_date, end_date):
+    """Run the parallel pass once and check every result is complete"""
+    print("\n⚡ Testing Parallel Execution...")
+    clear_caches(extractors)
+    if os.getenv("KPI_PROFILE") == "1":
+        results = await profile_parallel(extractors, start_date, end_date)
+    else:
+        results = await extract_parallel(extractors, start_date, end_date)
+
+    print(f"\n🔍 Data Integrity Check:")
+    passed = True
+    for name, kpis, sections in zip(("Operations", "Safety", "Combined"), results, KPI_SECTIONS):
+        ok = all(key in kpis for key in REQUIRED_KEYS) and kpis['date_range'] == {'start': start_date, 'end': end_date}
+        # A failed KPI query still yields its section, as {'error': ...}
+        missing = [section for section in sections if section not in kpis]
+        failed = [section for section in sections if isinstance(kpis.get(section), dict) and 'error' in kpis[section]]
+        ok = ok and not missing and not failed
+        passed = passed and ok
+        print(f"   - {name} KPIs complete: {'✅' if ok else '❌'}")
+        for section in missing:
+            print(f"       missing: {section}")
+        for section in failed:
+            print(f"       {section}: {kpis[section]['error']}")
+
+    if passed:
+        print("✅ All data integrity checks passed!")
+    else:
+        print("⚠️ Some data integrity issues detected")
+    return passed
+
+def warm_engine():
+    """Open a pooled SQLAlchemy connection; db.test_connection only touches the psycopg2 pool"""
+    with db.get_engine().connect() as conn:
+        conn.exec_driver_sql("SELECT 1")
+
+async def _run_sequential(extractors, start_date, end_date):
+    """Timed sequential pass: per-extractor and total nanoseconds"""
+    operations_extractor, safety_extractor, combined_extractor = extractors
+    sequential_start = time.perf_counter_ns()
+
+    ops_start = time.perf_counter_ns()
+    operations_kpis = operations_extractor.extract_all_kpis(start_date, end_date)
+    ops_ns = time.perf_counter_ns() - ops_start
+
+    safety_start = time.perf_counter_ns()
+    safety_kpis = safety_extractor.extract_all_kpis(start_date, end_date)
+    safety_ns = time.perf_counter_ns() - safety_start
+
+    combined_start = time.perf_counter_ns()
+    combined_kpis = combined_extractor.extract_all_kpis(start_date, end_date)
+    combined_ns = time.perf_counter_ns() - combined_start
+
+    sequential_ns = time.perf_counter_ns() - sequential_start
+    timings = {'operations': ops_ns, 'safety': safety_ns, 'combined': combined_ns, 'total': sequential_ns}
+    return timings, (operations_kpis, safety_kpis, combined_kpis)
+
+async def _run_parallel(extractors, start_date, end_date):
+    """Timed parallel pass: total nanoseconds"""
+    parallel_start = time.perf_counter_ns()
+    results = await extract_parallel(extractors, start_date, end_date)
+    parallel_ns = time.perf_counter_ns() - parallel_start
+    return {'total': parallel_ns}, results
+
+TIMED_PASSES = {'sequential': _run_sequential, 'parallel': _run_parallel}
+
+async def _timed_pass(mode, start_date, end_date):
+    """Build fresh extractors, warm the engine, then time one pass"""
+    asyncio.get_running_loop().set_default_executor(KPI_EXECUTOR)
+    extractors = (OperationsKPIExtractor(), SafetyKPIExtractor(), CombinedKPIExtractor())
+    warm_engine()
+    timings, results = await TIMED_PASSES[mode](extractors, start_date, end_date)
+    return timings, [kpi_digest(kpis) for kpis in results]
+
+def _timed_pass_process(mode, start_date, end_date, conn):
+    """Subprocess entry point; sends (timings, result digests) back over the pipe"""
+    try:
+        conn.send(asyncio.run(_timed_pass(mode, start_date, end_date)))
+    finally:
+        conn.close()
+
+def run_timed_pass(mode, start_date, end_date):
+    """Run one timed pass in a freshly spawned interpreter so no in-process state carries over between passes"""
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_timed_pass_process, args=(mode, start_date, end_date, sender))
+    process.start()
+    sender.close()
+    try:
+        return receiver.recv()
+    except EOFError:
+        raise RuntimeError(f"{mode} pass exited with code {process.exitcode}") from None
+    finally:
+        process.join()
+
+async def bench_parallel_vs_sequential(start_date, end_date):
+    """Time a sequential pass against a parallel pass, each in its own process (KPI_BENCH=1 only)"""
+    print("\n🔄 Testing Sequential Execution...")
+    sequential, sequential_digests = await asyncio.to_thread(run_timed_pass, 'sequential', start_date, end_date)
+
+    report = [
+        "Sequential Execution:",
+        f"   - Operations KPIs: {sequential['operations'] / 1e9:.3f}s",
+        f"   - Safety KPIs: {sequential['safety'] / 1e9:.3f}s",
+        f"   - Combined KPIs: {sequential['combined'] / 1e9:.3f}s",
+        f"   - Total Time: {sequential['total'] / 1e9:.3f}s",
+    ]
+    sys.stdout.write("\n".join(report) + "\n")
+
+    print("\n⚡ Timing Parallel Execution...")
+    parallel, parallel_digests = await asyncio.to_thread(run_timed_pass, 'parallel', start_date, end_date)
+
+    speedup = sequential['total'] / parallel['total']
+    saved_ns = sequential['total'] - parallel['total']
+
+    report = [
+        "Parallel Execution:",
+        f"   - Total Time: {parallel['total'] / 1e9:.3f}s",
+        f"   - DB Concurrency: {KPI_DB_CONCURRENCY}",
+        "",
+        "🚀 Performance Improvement:",
+        f"   - Speedup: {speedup:.2f}x",
+        f"   - Time Saved: {saved_ns / 1e9:.3f}s ({saved_ns / sequential['total'] * 100:.1f}%)",
+        "",
+        "🔍 Sequential vs Parallel Results:",
+    ]
+    # Extractions are deterministic for a fixed range, so both passes must return the same content
+    for name, sequential_digest, parallel_digest in zip(("Operations", "Safety", "Combined"), sequential_digests, parallel_digests):
+        report.append(f"   - {name} KPIs match: {'✅' if sequential_digest == parallel_digest else '❌'}")
+    report += ["", f"💡 Use the new endpoint: /api/all-kpis-parallel for {speedup:.1f}x faster KPI extraction"]
+    sys.stdout.write("\n".join(report) + "\n")
+
+    # One machine-readable record per run for CI to compare against a baseline
+    record = {
+        "sequential_s": sequential['total'] / 1e9,
+        "parallel_s": parallel['total'] / 1e9,
+        "speedup": speedup,
+        "ops_s": sequential['operations'] / 1e9,
+        "safety_s": sequential['safety'] / 1e9,
+        "combined_s": sequential['combined'] / 1e9,
+        "db_concurrency": KPI_DB_CONCURRENCY,
+        "results_match": sequential_digests == parallel_digests,
+        "date_range": {"start": start_date, "end": end_date},
+        "git_sha": os.getenv("GIT_SHA"),
+        "ts": datetime.now(timezone.utc).isoformat(),
+    }
+    BENCH_PATH.write_text(json.dumps(record, indent=2) + "\n")
+    print(f"\n📄 Timings written to {BENCH_PATH}")
+    return record
+
+def kpi_date_range():
+    """Last 30 days, which keeps the test passes fast"""
+    today = date.today()
+    return (today - timedelta(days=30)).isoformat(), today.isoformat()
+
+async def run_parallel_check():
+    """Test parallel KPI execution; set KPI_BENCH=1 to also time it against a sequential pass"""
     print("🧪 Testing Parallel KPI Execution")
     print("=" * 50)
-    
+
+    asyncio.get_running_loop().set_default_executor(KPI_EXECUTOR)
+
     try:
-        # Import the extractors
-        from data_extractor.operations_kpi_extractor import OperationsKPIExtractor
-        from data_extractor.safety_kpi_extractor import SafetyKPIExtractor
-        from data_extractor.combined_kpi_extractor import CombinedKPIExtractor
-        from concurrent.futures import ThreadPoolExecutor
-        
         # Initialize extractors
         print("📊 Initializing KPI extractors...")
-        operations_extractor = OperationsKPIExtractor()
-        safety_extractor = SafetyKPIExtractor()
-        combined_extractor = CombinedKPIExtractor()
+        extractors = (OperationsKPIExtractor(), SafetyKPIExtractor(), CombinedKPIExtractor())
         
         # Test database connection
         print("🔍 Testing database connection...")
-        from config.database import db
         if not db.test_connection():
             print("❌ Database connection failed")
             return
         print("✅ Database connection successful")
+        warm_engine()
         
         # Set date range (last 30 days for faster testing)
-        end_date = datetime.now().strftime('%Y-%m-%d')
-        start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+        start_date, end_date = kpi_date_range()
         print(f"📅 Date range: {start_date} to {end_date}")
-        
-        # Test sequential execution
-        print("\n🔄 Testing Sequential Execution...")
-        sequential_start = time.time()
-        
-        print("   - Extracting Operations KPIs...")
-        ops_start = time.time()
-        operations_kpis = operations_extractor.extract_all_kpis(start_date, end_date)
-        ops_time = time.time() - ops_start
-        
-        print("   - Extracting Safety KPIs...")
-        safety_start = time.time()
-        safety_kpis = safety_extractor.extract_all_kpis(start_date, end_date)
-        safety_time = time.time() - safety_start
-        
-        print("   - Extracting Combined KPIs...")
-        combined_start = time.time()
-        combined_kpis = combined_extractor.extract_all_kpis(start_date, end_date)
-        combined_time = time.time() - combined_start
-        
-        sequential_total = time.time() - sequential_start
-        
-        # Test parallel execution
-        print("\n⚡ Testing Parallel Execution...")
-        parallel_start = time.time()
-        
-        def extract_operations_sync():
-            return operations_extractor.extract_all_kpis(start_date, end_date)
-        
-        def extract_safety_sync():
-            return safety_extractor.extract_all_kpis(start_date, end_date)
-        
-        def extract_combined_sync():
-            return combined_extractor.extract_all_kpis(start_date, end_date)
-        
-        # Execute in parallel
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            operations_future = loop.run_in_executor(executor, extract_operations_sync)
-            safety_future = loop.run_in_executor(executor, extract_safety_sync)
-            combined_future = loop.run_in_executor(executor, extract_combined_sync)
-            
-            parallel_ops, parallel_safety, parallel_combined = await asyncio.gather(
-                operations_future, safety_future, combined_future
-            )
-        
-        parallel_total = time.time() - parallel_start
-        
-        # Results
-        print("\n📊 Performance Results:")
-        print("=" * 50)
-        print(f"Sequential Execution:")
-        print(f"   - Operations KPIs: {ops_time:.2f}s")
-        print(f"   - Safety KPIs: {safety_time:.2f}s")
-        print(f"   - Combined KPIs: {combined_time:.2f}s")
-        print(f"   - Total Time: {sequential_total:.2f}s")
-        
-        print(f"\nParallel Execution:")
-        print(f"   - Total Time: {parallel_total:.2f}s")
-        
-        speedup = sequential_total / parallel_total if parallel_total > 0 else 0
-        time_saved = sequential_total - parallel_total
-        
-        print(f"\n🚀 Performance Improvement:")
-        print(f"   - Speedup: {speedup:.2f}x")
-        print(f"   - Time Saved: {time_saved:.2f}s ({(time_saved/sequential_total*100):.1f}%)")
-        
-        # Verify data integrity
-        print(f"\n🔍 Data Integrity Check:")
-        ops_match = len(operations_kpis) == len(parallel_ops)
-        safety_match = len(safety_kpis) == len(parallel_safety)
-        combined_match = len(combined_kpis) == len(parallel_combined)
-        
-        print(f"   - Operations KPIs match: {'✅' if ops_match else '❌'}")
-        print(f"   - Safety KPIs match: {'✅' if safety_match else '❌'}")
-        print(f"   - Combined KPIs match: {'✅' if combined_match else '❌'}")
-        
-        if ops_match and safety_match and combined_match:
-            print("✅ All data integrity checks passed!")
-        else:
-            print("⚠️ Some data integrity issues detected")
+
+        await check_parallel_integrity(extractors, start_date, end_date)
+
+        if os.getenv("KPI_BENCH") == "1":
+            await bench_parallel_vs_sequential(start_date, end_date)
         
         print(f"\n🎉 Parallel execution test completed successfully!")
-        print(f"💡 Use the new endpoint: /api/all-kpis-parallel for {speedup:.1f}x faster KPI extraction")
         
     except Exception as e:
         print(f"❌ Error during parallel execution test: {e}")
-        import traceback
         traceback.print_exc()
 
+if pytest is not None:
+    @pytest.fixture(scope="module")
+    def kpi_run():
+        """Extractors, date range and one event loop (KPI_EXECUTOR as its default executor) shared by the tests"""
+        if not db.test_connection():
+            pytest.skip("database unavailable")
+        warm_engine()
+        loop = asyncio.new_event_loop()
+        loop.set_default_executor(KPI_EXECUTOR)
+        extractors = (OperationsKPIExtractor(), SafetyKPIExtractor(), CombinedKPIExtractor())
+        start_date, end_date = kpi_date_range()
+        yield loop, extractors, start_date, end_date
+        loop.close()
+
+    def test_parallel_results_complete(kpi_run):
+        loop, extractors, start_date, end_date = kpi_run
+        assert loop.run_until_complete(check_parallel_integrity(extractors, start_date, end_date))
+
+    @pytest.mark.skipif(os.getenv("KPI_BENCH") != "1", reason="set KPI_BENCH=1 to time sequential vs parallel")
+    def test_parallel_matches_sequential(kpi_run):
+        loop, _, start_date, end_date = kpi_run
+        record = loop.run_until_complete(bench_parallel_vs_sequential(start_date, end_date))
+        assert record["results_match"]
+
 if __name__ == "__main__":
-    asyncio.run(test_parallel_execution())
+    asyncio.run(run_parallel_check())